@@ -0,0 +1,457 @@
+"""
+Benchmarks the puzzle solvers, and their alternative implementations,
+on the real inputs and on synthetically scaled up versions of them.
+
+Usage -
+    python benchmark.py [--scales 1 10 100] [--repeat 3] [--filter day_six]
+                        [--output report.json] [--compare old_report.json]
+
+Every benchmark is timed over a number of repeats, and then run once
+more under tracemalloc to record its peak memory and the number of
+memory blocks it leaves allocated. tracemalloc can't count the
+allocations made along the way, so these retained blocks stand in for
+the allocation count. The report is written as JSON, along with the
+commit it was run on, so that reports from different commits can be
+compared with --compare.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+
+from datetime import datetime, timezone
+
+import day_one
+import day_two
+import day_three
+import day_four
+import day_five
+import day_six
+import day_seven
+import loader
+
+from config import DATA_DIR
+
+BENCHMARKS = []
+RETAINED_BLOCKS_NOTE = ('the number of memory blocks allocated by the run '
+                        'and still alive at its end, standing in for the '
+                        'number of allocations, which tracemalloc can\'t '
+                        'count')
+
+
+def benchmark(name, scalable=False):
+    """
+    Registers a benchmark. The decorated function takes the scale and a
+    numpy random Generator, prepares its input, and returns the function
+    to be timed. Benchmarks that aren't scalable only run at scale 1.
+    """
+    def _register(prepare):
+        BENCHMARKS.append({
+            'name': name,
+            'prepare': prepare,
+            'scalable': scalable,
+        })
+        return prepare
+    return _register
+
+def _read_data(input_file_name):
+    with open(os.path.join(DATA_DIR, input_file_name), 'rb') as fp:
+        return fp.read()
+
+def _random_box_ids(rng, count, length):
+    letters = rng.integers(ord('a'), ord('z') + 1, size=(count, length),
+                           dtype=np.uint8)
+    return [row.tobytes().decode() for row in letters]
+
+
+@benchmark('day_one.one')
+def _day_one_one(scale, rng):
+    return day_one.one
+
+@benchmark('day_one.two')
+def _day_one_two(scale, rng):
+    return day_one.two
+
+@benchmark('day_one.frequency_changes.sum', scalable=True)
+def _day_one_sum(scale, rng):
+    changes = day_one.get_frequency_changes('day_one.txt')
+    changes = np.tile(changes, scale)
+    return lambda: int(changes.sum())
+
+@benchmark('day_one.get_first_repeated_frequency', scalable=True)
+def _day_one_repeat(scale, rng):
+    changes = day_one._get_input_list('day_one.txt') * scale
+    return lambda: day_one.get_first_repeated_frequency(changes)
+
+@benchmark('day_one.get_first_repeated_frequency_analytic', scalable=True)
+def _day_one_repeat_analytic(scale, rng):
+    changes = day_one._get_input_list('day_one.txt') * scale
+    return lambda: day_one.get_first_repeated_frequency_analytic(changes)
+
+@benchmark('day_one.parse_signed_integers', scalable=True)
+def _day_one_parse(scale, rng):
+    input_data = np.frombuffer(_read_data('day_one.txt') * scale,
+                               dtype=np.uint8)
+    return lambda: day_one.parse_signed_integers(input_data)
+
+@benchmark('day_two.one')
+def _day_two_one(scale, rng):
+    return day_two.one
+
+@benchmark('day_two.two')
+def _day_two_two(scale, rng):
+    return day_two.two
+
+@benchmark('day_two.get_checksum', scalable=True)
+def _day_two_checksum(scale, rng):
+    box_ids = day_two._get_input_list('day_two.txt')
+    box_ids += _random_box_ids(rng, len(box_ids) * (scale - 1),
+                               len(box_ids[0]))
+    input_data = np.frombuffer('\n'.join(box_ids).encode(), dtype=np.uint8)
+    return lambda: day_two.get_checksum(day_two.get_id_matrix(input_data))
+
+@benchmark('day_two.get_similar_id_pairs', scalable=True)
+def _day_two_similar_ids(scale, rng):
+    box_ids = day_two._get_input_list('day_two.txt')
+    box_ids += _random_box_ids(rng, len(box_ids) * (scale - 1),
+                               len(box_ids[0]))
+    return lambda: day_two.get_similar_id_pairs(box_ids)
+
+@benchmark('day_three.one')
+def _day_three_one(scale, rng):
+    return day_three.one
+
+@benchmark('day_three.two')
+def _day_three_two(scale, rng):
+    return day_three.two
+
+def _get_scaled_claims(scale, rng):
+    claims = day_three._get_input_list('day_three.txt')
+    side = int(1000 * scale ** 0.5)
+    sizes = [(claim['w'], claim['h']) for claim in claims]
+    scaled_claims = []
+    for claim_id in range(len(claims) * scale):
+        w, h = sizes[rng.integers(len(sizes))]
+        scaled_claims.append({
+            'id': claim_id + 1,
+            'x': int(rng.integers(side - w)),
+            'y': int(rng.integers(side - h)),
+            'w': w,
+            'h': h,
+        })
+    return scaled_claims
+
+@benchmark('day_three.get_overlapping_area', scalable=True)
+def _day_three_overlap(scale, rng):
+    claims = _get_scaled_claims(scale, rng)
+    return lambda: day_three.get_overlapping_area(claims, sparse=False)
+
+@benchmark('day_three.get_overlapping_area_sparse', scalable=True)
+def _day_three_overlap_sparse(scale, rng):
+    claims = _get_scaled_claims(scale, rng)
+    return lambda: day_three.get_overlapping_area(claims, sparse=True)
+
+@benchmark('day_three.get_intact_claim_ids', scalable=True)
+def _day_three_intact(scale, rng):
+    claims = _get_scaled_claims(scale, rng)
+    return lambda: day_three.get_intact_claim_ids(claims, sparse=False)
+
+@benchmark('day_three.get_intact_claim_ids_sparse', scalable=True)
+def _day_three_intact_sparse(scale, rng):
+    claims = _get_scaled_claims(scale, rng)
+    return lambda: day_three.get_intact_claim_ids(claims, sparse=True)
+
+@benchmark('day_four.one')
+def _day_four_one(scale, rng):
+    return day_four.one
+
+@benchmark('day_four.two')
+def _day_four_two(scale, rng):
+    return day_four.two
+
+def _get_scaled_guard_log(scale):
+    """
+    Repeats the guard log once per scale, each copy moved to a later
+    year, so that the copies don't interleave.
+    """
+    input_data = _read_data('day_four.txt')
+    return b''.join(input_data.replace(b'[1518-',
+                                       '[{}-'.format(1518 + copy).encode())
+                    for copy in range(scale))
+
+@benchmark('day_four.get_sorted_security_actions')
+def _day_four_dict_log(scale, rng):
+    return lambda: day_four.get_sorted_security_actions('day_four.txt')
+
+@benchmark('day_four.parse_security_actions', scalable=True)
+def _day_four_columns(scale, rng):
+    input_data = np.frombuffer(_get_scaled_guard_log(scale), dtype=np.uint8)
+    return lambda: day_four.parse_security_actions(input_data)
+
+@benchmark('day_four.get_guards_sleep_times', scalable=True)
+def _day_four_sleep_times(scale, rng):
+    input_data = np.frombuffer(_get_scaled_guard_log(scale), dtype=np.uint8)
+    security_actions = day_four.parse_security_actions(input_data)
+    return lambda: day_four.get_guards_sleep_times(security_actions)
+
+@benchmark('day_four.get_sleep_matrix', scalable=True)
+def _day_four_sleep_matrix(scale, rng):
+    input_data = np.frombuffer(_get_scaled_guard_log(scale), dtype=np.uint8)
+    security_actions = day_four.parse_security_actions(input_data)
+    return lambda: day_four.get_sleep_matrix(security_actions)
+
+@benchmark('day_four.GuardSleepTracker', scalable=True)
+def _day_four_tracker(scale, rng):
+    input_lines = _get_scaled_guard_log(scale).decode().splitlines()
+
+    def _track():
+        tracker = day_four.GuardSleepTracker(reorder_window=10 ** 9)
+        tracker.add_lines(input_lines)
+        tracker.flush()
+        return tracker.get_heaviest_sleeper_minute()
+    return _track
+
+@benchmark('day_five.one')
+def _day_five_one(scale, rng):
+    return day_five.one
+
+@benchmark('day_five.one_optimised')
+def _day_five_one_optimised(scale, rng):
+    return day_five.one_optimised
+
+@benchmark('day_five.two')
+def _day_five_two(scale, rng):
+    return day_five.two
+
+@benchmark('day_five.react', scalable=True)
+def _day_five_react(scale, rng):
+    units = list(day_five._get_polymer('day_five.txt') * scale)
+    return lambda: day_five.react(units)
+
+@benchmark('day_five.reduce_polymer', scalable=True)
+def _day_five_reduce(scale, rng):
+    polymer = day_five._get_polymer('day_five.txt') * scale
+    return lambda: day_five.reduce_polymer(polymer)
+
+@benchmark('day_five.reduce_polymer_stream', scalable=True)
+def _day_five_reduce_stream(scale, rng):
+    polymer = day_five._get_polymer('day_five.txt') * scale
+    chunk_size = day_five.STREAM_CHUNK_SIZE
+    return lambda: day_five.reduce_polymer_stream(
+        polymer[start: start + chunk_size]
+        for start in range(0, len(polymer), chunk_size))
+
+@benchmark('day_five.get_unit_removal_lengths', scalable=True)
+def _day_five_removals(scale, rng):
+    polymer = day_five._get_polymer('day_five.txt') * scale
+    reduced_form = day_five.reduce_polymer(polymer)
+    return lambda: day_five.get_unit_removal_lengths(reduced_form)
+
+@benchmark('day_six.one')
+def _day_six_one(scale, rng):
+    return day_six.one
+
+@benchmark('day_six.two')
+def _day_six_two(scale, rng):
+    return day_six.two
+
+def _get_scaled_coordinates(scale, rng):
+    coordinates = day_six._get_input_list('day_six.txt')
+    low, high = coordinates.min(axis=0), coordinates.max(axis=0)
+    return rng.integers(low, high + 1, size=(len(coordinates) * scale, 2))
+
+@benchmark('day_six.get_area_map', scalable=True)
+def _day_six_area_map(scale, rng):
+    coordinates = _get_scaled_coordinates(scale, rng)
+    return lambda: day_six.get_area_map(coordinates)
+
+@benchmark('day_six.get_connected_area', scalable=True)
+def _day_six_connected_area(scale, rng):
+    coordinates = _get_scaled_coordinates(scale, rng)
+    max_distance = 10000 * scale
+    return lambda: day_six.get_connected_area(coordinates, max_distance)
+
+@benchmark('day_six.get_connected_area_size', scalable=True)
+def _day_six_connected_area_size(scale, rng):
+    coordinates = _get_scaled_coordinates(scale, rng)
+    max_distance = 10000 * scale
+    return lambda: day_six.get_connected_area_size(coordinates, max_distance)
+
+@benchmark('day_seven.one')
+def _day_seven_one(scale, rng):
+    return day_seven.one
+
+@benchmark('day_seven.two')
+def _day_seven_two(scale, rng):
+    return day_seven.two
+
+def _get_scaled_instructions(scale):
+    """
+    Repeats the instructions once per scale, with the tasks of each copy
+    renamed, so that the copies form separate graphs.
+    """
+    instructions = day_seven.get_instructions('day_seven.txt')
+    return [(task + str(copy), prerequisite + str(copy))
+            for copy in range(scale)
+            for task, prerequisite in instructions]
+
+@benchmark('day_seven.get_tasks_order')
+def _day_seven_networkx_order(scale, rng):
+    instructions = day_seven.get_instructions('day_seven.txt')
+    graph = day_seven.get_instructions_graph(instructions)
+    return lambda: day_seven.get_tasks_order(graph)
+
+@benchmark('day_seven.get_task_graph_order', scalable=True)
+def _day_seven_order(scale, rng):
+    instructions = _get_scaled_instructions(scale)
+    return lambda: day_seven.get_task_graph_order(
+        day_seven.get_task_graph(instructions))
+
+@benchmark('day_seven.simulate_workers', scalable=True)
+def _day_seven_simulate(scale, rng):
+    task_graph = day_seven.get_task_graph(_get_scaled_instructions(scale))
+    task_times = day_seven.get_task_times(task_graph, 60)
+    return lambda: day_seven.simulate_workers(task_graph, task_times, 5)
+
+@benchmark('day_seven.get_task_graph_analysis', scalable=True)
+def _day_seven_analysis(scale, rng):
+    task_graph = day_seven.get_task_graph(_get_scaled_instructions(scale))
+    task_times = day_seven.get_task_times(task_graph, 60)
+    return lambda: day_seven.get_task_graph_analysis(task_graph, task_times)
+
+@benchmark('day_seven.get_times_of_completion', scalable=True)
+def _day_seven_worker_sweep(scale, rng):
+    task_graph = day_seven.get_task_graph(_get_scaled_instructions(scale))
+    task_times = day_seven.get_task_times(task_graph, 60)
+    return lambda: day_seven.get_times_of_completion(task_graph, task_times,
+                                                     range(1, 21))
+
+
+def run_benchmark(function, repeat):
+    """
+    Runs the function repeat times for timing, then once more under
+    tracemalloc, and returns the measurements as a dict. The
+    retained_blocks are the memory blocks allocated by that run which
+    are still alive at its end, from a diff of the snapshots taken
+    before and after it, standing in for the number of allocations.
+    """
+    wall_times = []
+    for _ in range(repeat):
+        loader.clear_memoized_inputs()
+        gc.collect()
+        start_time = time.perf_counter()
+        function()
+        wall_times.append(time.perf_counter() - start_time)
+    loader.clear_memoized_inputs()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start_snapshot = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        end_snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained_blocks = sum(statistic.count_diff for statistic
+                          in end_snapshot.compare_to(start_snapshot,
+                                                     'filename'))
+    measurements = {
+        'wall_time_min': min(wall_times),
+        'wall_time_mean': sum(wall_times) / len(wall_times),
+        'peak_memory_bytes': peak_memory,
+        'retained_blocks': retained_blocks,
+    }
+    return measurements
+
+def run_benchmarks(scales=(1,), repeat=3, name_filter=None, seed=0,
+                   log=None):
+    """
+    Runs all the registered benchmarks whose names contain name_filter,
+    at each of the scales, and returns the report as a dict.
+    """
+    results = []
+    for benchmark_info in BENCHMARKS:
+        if name_filter and name_filter not in benchmark_info['name']:
+            continue
+        for scale in scales:
+            if scale != 1 and not benchmark_info['scalable']:
+                continue
+            rng = np.random.default_rng(seed)
+            function = benchmark_info['prepare'](scale, rng)
+            result = {'name': benchmark_info['name'], 'scale': scale,
+                      'repeat': repeat}
+            result.update(run_benchmark(function, repeat))
+            results.append(result)
+            if log:
+                log('{name} x{scale}: {wall_time_min:.4f}s, '
+                    '{peak_memory_bytes} bytes peak'.format(**result))
+    report = {
+        'commit': _get_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'notes': {'retained_blocks': RETAINED_BLOCKS_NOTE},
+        'results': results,
+    }
+    return report
+
+def _get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_reports(old_report, new_report):
+    """
+    Returns a list of (name, scale, time_ratio, memory_ratio) tuples,
+    one per benchmark present in both the reports, with the ratios being
+    new over old.
+    """
+    old_results = {(result['name'], result['scale']): result
+                   for result in old_report['results']}
+    comparisons = []
+    for result in new_report['results']:
+        old_result = old_results.get((result['name'], result['scale']))
+        if old_result is None:
+            continue
+        time_ratio = result['wall_time_min'] / \
+                     max(old_result['wall_time_min'], 1e-9)
+        memory_ratio = result['peak_memory_bytes'] / \
+                       max(old_result['peak_memory_bytes'], 1)
+        comparisons.append((result['name'], result['scale'], time_ratio,
+                            memory_ratio))
+    return comparisons
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--filter', dest='name_filter')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_report.json')
+    parser.add_argument('--compare')
+    args = parser.parse_args(argv)
+    report = run_benchmarks(args.scales, args.repeat, args.name_filter,
+                            args.seed, log=print)
+    with open(args.output, 'w') as fp:
+        json.dump(report, fp, indent=2)
+    if args.compare:
+        with open(args.compare, 'r') as fp:
+            old_report = json.load(fp)
+        for name, scale, time_ratio, memory_ratio in \
+                compare_reports(old_report, report):
+            print('{} x{}: {:.2f}x time, {:.2f}x peak memory'.format(
+                name, scale, time_ratio, memory_ratio))
+
+if __name__ == '__main__':
+    main()
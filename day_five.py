@@ -1,13 +1,34 @@
+import mmap
 import os
 import string
 
+import numpy as np
+
+from functools import partial
+
 from config import DATA_DIR
+from loader import load_input
+from parallel import map_with_fallback
+
+STREAM_CHUNK_SIZE = 2 ** 20
+CHUNKS_PER_PROCESS = 4
+
 
+def _parse_input_file(input_data_file):
+    with open(input_data_file, 'rb') as fp:
+        polymer = fp.read().translate(None, b'\r\n')
+    return np.frombuffer(polymer, dtype=np.uint8)
+
+def _get_polymer(input_file_name):
+    """
+    Returns the polymer in the input file as bytes, with the line
+    breaks removed.
+    """
+    polymer = load_input(input_file_name, _parse_input_file, 'polymer')
+    return polymer.tobytes()
 
 def _get_input_data(input_file_name):
-    input_data_file = os.path.join(DATA_DIR, input_file_name)
-    with open(input_data_file, 'r') as fp:
-        input_data = fp.read()
+    input_data = _get_polymer(input_file_name).decode()
     return input_data
 
 def react(units):
@@ -74,35 +95,215 @@ def react(units):
         right_half = units[mid:]
         return _merge_units(react(left_half), react(right_half))
 
+def reduce_polymer(units, reduced_form=None):
+    """
+    Reacts the units of a polymer in a single pass, using the reduced
+    form built so far as a stack. Each unit either reacts with (and
+    pops) the unit on top of the stack, or is pushed onto it.
+
+    Inputs -
+        units - bytes, bytearray or any iterable of the ASCII value of
+            the units in a polymer.
+        reduced_form - bytearray, an already reduced polymer that the
+            units are reacted onto; it is extended in place.
+
+    Returns -
+        reduced_form - a bytearray of ASCII value of all the polymer
+            units where no consecutive units can react with each other.
+    """
+    if reduced_form is None:
+        reduced_form = bytearray()
+    push = reduced_form.append
+    pop = reduced_form.pop
+    top = reduced_form[-1] if reduced_form else None
+    for unit in units:
+        if top is not None and abs(top - unit) == 32:
+            pop()
+            top = reduced_form[-1] if reduced_form else None
+        else:
+            push(unit)
+            top = unit
+    return reduced_form
+
+def reduce_polymer_stream(chunks):
+    """
+    Reduces a polymer which is given in chunks, so that it never has to
+    be held in memory as a whole. Only the reduced form is kept, so the
+    memory used is proportional to the reduced polymer and not to the
+    input. Line breaks in the chunks are ignored.
+
+    Inputs -
+        chunks - an iterable of bytes, the consecutive parts of a
+            polymer.
+
+    Returns -
+        reduced_form - a bytearray of ASCII value of all the polymer
+            units where no consecutive units can react with each other.
+    """
+    reduced_form = bytearray()
+    for chunk in chunks:
+        reduce_polymer(chunk.translate(None, b'\r\n'), reduced_form)
+    return reduced_form
+
+def reduce_polymer_file(input_file_name, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Reduces the polymer in a file by reading it chunk_size bytes at a
+    time. Same as reduce_polymer_stream(), but for a file in DATA_DIR.
+    """
+    input_data_file = os.path.join(DATA_DIR, input_file_name)
+    with open(input_data_file, 'rb') as fp:
+        chunks = iter(lambda: fp.read(chunk_size), b'')
+        reduced_form = reduce_polymer_stream(chunks)
+    return reduced_form
+
+def merge_reduced_polymers(left_form, right_form):
+    """
+    Joins two reduced polymers, the parallel of react()'s _merge_units.
+    Only the units at the boundary can react, pairwise outwards from it,
+    so the matching tails are found with a single vectorized comparison
+    and cut off.
+
+    Inputs -
+        left_form - bytearray, a reduced polymer; it is extended in
+            place.
+        right_form - bytes or bytearray, a reduced polymer that follows
+            left_form.
+
+    Returns -
+        left_form - the reduced polymer of left_form and right_form
+            joined together.
+    """
+    boundary = min(len(left_form), len(right_form))
+    left_tail = np.frombuffer(left_form, dtype=np.uint8,
+                              count=boundary, offset=len(left_form) - boundary)
+    right_head = np.frombuffer(right_form, dtype=np.uint8, count=boundary)
+    reacting = np.abs(left_tail[::-1].astype(np.int16) - right_head) == 32
+    reacting_pairs = boundary if reacting.all() else int(np.argmin(reacting))
+    del left_tail, right_head
+    del left_form[len(left_form) - reacting_pairs:]
+    left_form += memoryview(right_form)[reacting_pairs:]
+    return left_form
+
+def _reduce_file_chunk(input_data_file, start, stop):
+    """
+    Reduces the units between the byte offsets start and stop of a
+    polymer file, reading them through a read-only mmap so that the
+    worker processes don't need the polymer to be sent to them.
+    """
+    with open(input_data_file, 'rb') as fp, \
+            mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as polymer:
+        units = polymer[start:stop].translate(None, b'\r\n')
+    return bytes(reduce_polymer(units))
+
+def reduce_polymer_parallel(input_file_name, processes=None,
+                            chunk_size=None):
+    """
+    Reduces the polymer in a file across several processes. The file
+    is split into byte ranges, each range is reduced on its own, and
+    the reduced ranges are then joined pairwise, in a tree, with
+    merge_reduced_polymers(). Reacting is associative in this way, so
+    the result is the same as reducing the whole polymer at once.
+
+    Inputs -
+        input_file_name - the name of the polymer file in DATA_DIR.
+        processes - int, the number of worker processes, as in
+            map_with_fallback().
+        chunk_size - int, the number of bytes per range. Defaults to
+            splitting the file into CHUNKS_PER_PROCESS ranges per
+            process.
+
+    Returns -
+        reduced_form - a bytearray of ASCII value of all the polymer
+            units where no consecutive units can react with each other.
+    """
+    input_data_file = os.path.join(DATA_DIR, input_file_name)
+    file_size = os.path.getsize(input_data_file)
+    if file_size == 0:
+        return bytearray()
+    if chunk_size is None:
+        chunks = CHUNKS_PER_PROCESS * (processes or os.cpu_count() or 1)
+        chunk_size = -(-file_size // chunks)
+    starts = range(0, file_size, chunk_size)
+    stops = [min(start + chunk_size, file_size) for start in starts]
+    reduce_chunk = partial(_reduce_file_chunk, input_data_file)
+    reduced_chunks = map_with_fallback(reduce_chunk, starts, stops,
+                                       processes=processes)
+    reduced_forms = [bytearray(reduced_chunk)
+                     for reduced_chunk in reduced_chunks]
+    while len(reduced_forms) > 1:
+        merged_forms = [merge_reduced_polymers(left_form, right_form)
+                        for left_form, right_form
+                        in zip(reduced_forms[::2], reduced_forms[1::2])]
+        if len(reduced_forms) % 2:
+            merged_forms.append(reduced_forms[-1])
+        reduced_forms = merged_forms
+    return reduced_forms[0]
+
 def one():
-    polymer = _get_input_data('day_five.txt')
-    units = [ord(char) for char in polymer]
-    units = react(units)
-    return len(units)
+    """
+    The polymer is streamed with reduce_polymer_file(), so that only the
+    reduced form, rather than the whole polymer, is held in memory. The
+    cached polymer from load_input() saves reading the line breaks out
+    on later runs, but at the cost of holding all of it.
+    """
+    reduced_form = reduce_polymer_file('day_five.txt')
+    return len(reduced_form)
 
 def one_optimised():
     polymer = _get_input_data('day_five.txt')
-    i = 0
-    while True:
-        try:
-            if polymer[i] == polymer[i + 1].swapcase():
-                polymer = polymer[: i] + polymer[i + 2:]
-                if i > 0:
-                    i -= 1
-            else:
-                i += 1
-        except IndexError:
-            break
-    return len(polymer)
-
-def two():
-    polymer = _get_input_data('day_five.txt')
-    reduced_polymer_lengths = {}
-    for i in range(26):
-        lowercase_unit = string.ascii_letters[i]
-        uppercase_unit = string.ascii_letters[i + 26]
-        new_polymer = polymer.replace(lowercase_unit, '')
-        new_polymer = new_polymer.replace(uppercase_unit, '')
-        units = [ord(char) for char in new_polymer]
-        reduced_polymer_lengths[string.ascii_letters[i]] = len(react(units))
+    i = 0
+    while True:
+        try:
+            if polymer[i] == polymer[i + 1].swapcase():
+                polymer = polymer[: i] + polymer[i + 2:]
+                if i > 0:
+                    i -= 1
+            else:
+                i += 1
+        except IndexError:
+            break
+    return len(polymer)
+
+def _get_reduced_length_without(reduced_form, unit_type):
+    """
+    Returns the length of the reduced polymer after removing all units
+    of unit_type (of either polarity) from it.
+    """
+    removed_units = unit_type.encode() + unit_type.swapcase().encode()
+    units = reduced_form.translate(None, removed_units)
+    return len(reduce_polymer(units))
+
+def get_unit_removal_lengths(reduced_form, processes=None):
+    """
+    Removes each of the 26 unit types in turn from a reduced polymer
+    and returns the length of what it further reduces to. Removing a
+    unit type commutes with reacting the polymer, so running these on
+    the reduced form gives the same lengths as running them on the
+    original polymer, at a fraction of the cost.
+
+    Inputs -
+        reduced_form - bytes or bytearray, a polymer where no
+            consecutive units can react with each other.
+        processes - int, the number of worker processes to spread the
+            removals across, as in map_with_fallback().
+
+    Returns -
+        reduced_polymer_lengths - a dict with the lowercase unit types
+            as the keys and the respective reduced lengths as values.
+    """
+    reduced_form = bytes(reduced_form)
+    unit_types = string.ascii_lowercase
+    get_length = partial(_get_reduced_length_without, reduced_form)
+    lengths = map_with_fallback(get_length, unit_types, processes=processes)
+    reduced_polymer_lengths = dict(zip(unit_types, lengths))
+    return reduced_polymer_lengths
+
+def two(processes=None):
+    """
+    Streams the polymer like one(), and removes the unit types from the
+    reduced form only.
+    """
+    reduced_form = reduce_polymer_file('day_five.txt')
+    reduced_polymer_lengths = get_unit_removal_lengths(reduced_form,
+                                                        processes)
     return min(reduced_polymer_lengths.values())
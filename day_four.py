@@ -1,10 +1,20 @@
+import heapq
 import os
 
 import numpy as np
 
-from datetime import datetime
+from datetime import date, datetime
 
 from config import DATA_DIR
+from loader import load_input
+
+TIMESTAMP_WIDTH = len('[1518-05-28 00:59]')
+GUARD_ID_OFFSET = len('[1518-05-28 00:59] Guard #')
+GUARD_ID_WIDTH = 10
+
+BEGINS_SHIFT = 0
+SLEEPS = 1
+WAKES_UP = 2
 
 
 def _parse_info(input_line):
@@ -43,6 +53,116 @@ def get_sorted_security_actions(input_file_name):
     security_actions.sort(key=lambda x: x['date_time'])
     return security_actions
 
+def _get_numbers(input_data, positions):
+    """
+    Reads the decimal numbers starting at each of the positions in the
+    raw input, stopping at the first non-digit of each.
+
+    Inputs -
+        input_data - an np.uint8 array of the raw bytes of the log.
+        positions - an np.array of shape (n, width), the positions of
+            the characters that may make up each number.
+
+    Returns -
+        numbers - an np.int64 array of length n.
+    """
+    characters = input_data[positions.clip(0, input_data.size - 1)]
+    digits = characters.astype(np.int64) - ord('0')
+    is_digit = (digits >= 0) & (digits <= 9) & \
+                (positions < input_data.size)
+    is_digit = np.logical_and.accumulate(is_digit, axis=1)
+    digit_counts = is_digit.sum(axis=1, keepdims=True)
+    places = digit_counts - 1 - np.arange(positions.shape[1])
+    numbers = np.where(is_digit, digits * 10 ** places.clip(0), 0)
+    return numbers.sum(axis=1)
+
+def parse_security_actions(input_data):
+    """
+    Parses a whole guard log at once into columns, relying on the fixed
+    width "[YYYY-MM-DD HH:MM] " prefix of every line, and returns them
+    sorted by their date_time.
+
+    Inputs -
+        input_data - an np.uint8 array of the raw bytes of the log.
+
+    Returns -
+        security_actions - a dict of np.arrays of the same length, with
+            ['date_time', 'minute', 'minute_of_day', 'action_type',
+            'guard_id'] as the keys. 'date_time' is the timestamp packed
+            into an int64, 'action_type' is one of BEGINS_SHIFT, SLEEPS
+            and WAKES_UP, and 'guard_id' is -1 except on the lines
+            beginning shifts.
+    """
+    line_ends = np.flatnonzero(input_data == ord('\n'))
+    line_starts = np.concatenate(([0], line_ends + 1))
+    line_ends = np.append(line_ends, input_data.size)
+    line_starts = line_starts[line_ends - line_starts > TIMESTAMP_WIDTH]
+
+    def _get_field(offset, width):
+        positions = line_starts[:, None] + offset + np.arange(width)
+        return _get_numbers(input_data, positions)
+
+    year, month, day = _get_field(1, 4), _get_field(6, 2), _get_field(9, 2)
+    hour, minute = _get_field(12, 2), _get_field(15, 2)
+    date_time = (((year * 13 + month) * 32 + day) * 24 + hour) * 60 + minute
+    action_initials = input_data[line_starts + TIMESTAMP_WIDTH + 1]
+    action_type = np.full(len(line_starts), BEGINS_SHIFT, dtype=np.int8)
+    action_type[action_initials == ord('f')] = SLEEPS
+    action_type[action_initials == ord('w')] = WAKES_UP
+    guard_id = np.where(action_type == BEGINS_SHIFT,
+                        _get_field(GUARD_ID_OFFSET, GUARD_ID_WIDTH), -1)
+    order = np.argsort(date_time, kind='stable')
+    security_actions = {
+        'date_time': date_time[order],
+        'minute': minute[order].astype(np.int8),
+        'minute_of_day': (hour * 60 + minute)[order].astype(np.int16),
+        'action_type': action_type[order],
+        'guard_id': guard_id[order].astype(np.int32),
+    }
+    return security_actions
+
+def _parse_input_file(input_data_file):
+    """
+    Parses a guard log file with parse_security_actions(), and returns
+    the columns as a single structured np.array.
+    """
+    with open(input_data_file, 'rb') as fp:
+        input_data = np.frombuffer(fp.read(), dtype=np.uint8)
+    security_actions = parse_security_actions(input_data)
+    columns = np.zeros(len(security_actions['date_time']),
+                       dtype=[(key, column.dtype) for key, column
+                              in security_actions.items()])
+    for key, column in security_actions.items():
+        columns[key] = column
+    return columns
+
+def get_sorted_security_action_columns(input_file_name):
+    columns = load_input(input_file_name, _parse_input_file,
+                         'security_actions')
+    return {key: columns[key] for key in columns.dtype.names}
+
+def _get_naps(security_actions, time_column='minute'):
+    """
+    Returns the naps in the columns of security actions as arrays of
+    (guard_id, sleeping_minute, waking_up_minute), one entry per nap,
+    with the minutes taken from the time_column of security_actions.
+    """
+    action_type = security_actions['action_type']
+    row_ids = np.arange(len(action_type))
+    shift_rows = np.maximum.accumulate(
+        np.where(action_type == BEGINS_SHIFT, row_ids, -1))
+    sleep_rows = np.maximum.accumulate(
+        np.where(action_type == SLEEPS, row_ids, -1))
+    wake_rows = np.flatnonzero(action_type == WAKES_UP)
+    guard_ids = np.where(shift_rows[wake_rows] >= 0,
+                         security_actions['guard_id'][shift_rows[wake_rows]],
+                         0)
+    sleeping_minutes = np.where(
+        sleep_rows[wake_rows] >= 0,
+        security_actions[time_column][sleep_rows[wake_rows]], 0)
+    waking_up_minutes = security_actions[time_column][wake_rows]
+    return guard_ids, sleeping_minutes, waking_up_minutes
+
 def get_guards_sleep_times(security_actions):
     """
     Returns a dict with guard id as the key and that guard's sleeping
@@ -50,7 +170,8 @@ def get_guards_sleep_times(security_actions):
 
     Inputs -
         security_actions - a list of dicts, each dict representing a
-            guard's action, sorted by date_time key of the dicts.
+            guard's action, sorted by date_time key of the dicts; or
+            the dict of columns returned by parse_security_actions().
 
     Returns -
         guards_sleep_times - a dict with guard id as the key and a
@@ -58,6 +179,14 @@ def get_guards_sleep_times(security_actions):
             column gives the number of times the guard has slept in
             that minute (of any day).
     """
+    if isinstance(security_actions, dict):
+        guards_sleep_times = {}
+        for guard_id, sleeping_minute, waking_up_minute in \
+                zip(*_get_naps(security_actions)):
+            guard_sleep_times = guards_sleep_times.setdefault(int(guard_id),
+                                                              np.zeros(60))
+            guard_sleep_times[sleeping_minute: waking_up_minute] += 1
+        return guards_sleep_times
     guards_sleep_times = {}
     current_guard_id = 0
     sleeping_minute = 0
@@ -141,16 +270,251 @@ def get_sleepiest_minute(guards_sleep_times, guard_id):
     """
     return guards_sleep_times[guard_id].argmax()
 
+def get_sleep_matrix(security_actions, minute_window=(0, 60)):
+    """
+    Returns a matrix with one row per guard and one column per minute,
+    giving the number of times the guard has slept in that minute.
+    Each nap only marks its start and end in a difference array, which
+    is then summed along the minutes.
+
+    Inputs -
+        security_actions - the dict of columns returned by
+            parse_security_actions().
+        minute_window - (start, end), the minutes of the day covered by
+            the columns of the matrix; naps are clipped to it.
+
+    Returns -
+        sleep_matrix - an np.int32 array of shape (number of guards,
+            end - start).
+        guard_ids - an np.array with the guard id of each row, in the
+            order in which the guards are first seen waking up.
+    """
+    nap_guard_ids, sleeping_minutes, waking_up_minutes = _get_naps(
+        security_actions, 'minute_of_day')
+    window_start, window_end = minute_window
+    window_width = window_end - window_start
+    guard_ids, first_naps, guard_rows = np.unique(
+        nap_guard_ids, return_index=True, return_inverse=True)
+    row_order = np.argsort(first_naps)
+    guard_rows = np.argsort(row_order)[guard_rows.ravel()]
+    sleep_starts = (sleeping_minutes.astype(np.int64) -
+                    window_start).clip(0, window_width)
+    sleep_ends = (waking_up_minutes.astype(np.int64) -
+                  window_start).clip(sleep_starts, window_width)
+    differences = np.zeros((len(guard_ids), window_width + 1),
+                           dtype=np.int32)
+    np.add.at(differences, (guard_rows, sleep_starts), 1)
+    np.add.at(differences, (guard_rows, sleep_ends), -1)
+    sleep_matrix = differences.cumsum(axis=1, dtype=np.int32)[:, :-1]
+    return sleep_matrix, guard_ids[row_order]
+
+def get_heaviest_sleeper_minute(sleep_matrix, guard_ids,
+                                minute_window=(0, 60)):
+    """
+    Returns the id of the guard who has slept the most minutes, and the
+    minute in which that guard has slept the most.
+
+    Inputs -
+        sleep_matrix, guard_ids - as returned by get_sleep_matrix().
+        minute_window - the same minute_window as given to
+            get_sleep_matrix().
+
+    Returns -
+        (heaviest_sleeper, sleepiest_minute)
+    """
+    guard_row = sleep_matrix.sum(axis=1).argmax()
+    sleepiest_minute = minute_window[0] + sleep_matrix[guard_row].argmax()
+    return int(guard_ids[guard_row]), int(sleepiest_minute)
+
+def get_routine_sleeper_minute(sleep_matrix, guard_ids,
+                               minute_window=(0, 60)):
+    """
+    Returns the id of the guard who slept most frequently at any one
+    particular minute, and that minute, with a single argmax over the
+    whole matrix.
+
+    Inputs - same as get_heaviest_sleeper_minute().
+
+    Returns -
+        (routine_sleeper, sleepiest_minute)
+    """
+    guard_row, column = np.unravel_index(sleep_matrix.argmax(),
+                                         sleep_matrix.shape)
+    sleepiest_minute = minute_window[0] + column
+    return int(guard_ids[guard_row]), int(sleepiest_minute)
+
+def _get_log_entry(input_line):
+    """
+    Parses a guard log line by slicing its fixed width timestamp, and
+    returns (timestamp, minute, action_type, guard_id), with timestamp
+    being the number of minutes since 0001-01-01 00:00 and guard_id
+    being -1 except on the lines beginning shifts.
+    """
+    year, month, day = (int(input_line[1:5]), int(input_line[6:8]),
+                        int(input_line[9:11]))
+    hour, minute = int(input_line[12:14]), int(input_line[15:17])
+    timestamp = date(year, month, day).toordinal() * 1440 + hour * 60 + \
+                minute
+    action_initial = input_line[TIMESTAMP_WIDTH + 1]
+    guard_id = -1
+    if action_initial == 'f':
+        action_type = SLEEPS
+    elif action_initial == 'w':
+        action_type = WAKES_UP
+    else:
+        action_type = BEGINS_SHIFT
+        guard_id = int(input_line[GUARD_ID_OFFSET:].split()[0])
+    return timestamp, minute, action_type, guard_id
+
+class GuardSleepTracker:
+    """
+    Keeps the sleep statistics of the guards up to date as new lines
+    are appended to the log, so that neither of the strategies needs
+    the log to be read again.
+
+    Lines may arrive out of order, as long as no line is older than the
+    newest line seen by more than reorder_window minutes. Lines are held
+    back until they fall out of the reorder window, so that they can be
+    applied in order; flush() applies all the held back lines.
+    """
+
+    def __init__(self, reorder_window=60, minutes=60):
+        self.reorder_window = reorder_window
+        self.minutes = minutes
+        self.guards_sleep_times = {}
+        self.guards_total_sleep = {}
+        self.guards_sleepiest_minutes = {}
+        self._guard_orders = {}
+        self.heaviest_sleeper = None
+        self.routine_sleeper = None
+        self.routine_minute = None
+        self.current_guard_id = 0
+        self.asleep_since = None
+        self._pending_entries = []
+        self._entry_count = 0
+        self._newest_timestamp = None
+        self._applied_timestamp = None
+
+    def add_line(self, input_line):
+        """
+        Adds a single log line, of the format "[datetime] guard-action".
+        Raises a ValueError if the line is older than the lines that have
+        already been applied.
+        """
+        input_line = input_line.strip()
+        if not input_line:
+            return
+        entry = _get_log_entry(input_line)
+        timestamp = entry[0]
+        if self._applied_timestamp is not None and \
+                timestamp < self._applied_timestamp:
+            raise ValueError('Log line is older than the reorder window '
+                             'allows: {}'.format(input_line))
+        heapq.heappush(self._pending_entries,
+                       (timestamp, self._entry_count, entry))
+        self._entry_count += 1
+        if self._newest_timestamp is None or \
+                timestamp > self._newest_timestamp:
+            self._newest_timestamp = timestamp
+        self._apply_pending_entries(self._newest_timestamp -
+                                    self.reorder_window)
+
+    def add_lines(self, input_lines):
+        for input_line in input_lines:
+            self.add_line(input_line)
+
+    def flush(self):
+        """
+        Applies all the lines that are being held back for reordering.
+        """
+        if self._newest_timestamp is not None:
+            self._apply_pending_entries(self._newest_timestamp)
+
+    def _apply_pending_entries(self, until_timestamp):
+        while self._pending_entries and \
+                self._pending_entries[0][0] <= until_timestamp:
+            timestamp, _, entry = heapq.heappop(self._pending_entries)
+            self._applied_timestamp = timestamp
+            self._apply_entry(*entry)
+
+    def _apply_entry(self, timestamp, minute, action_type, guard_id):
+        if action_type == BEGINS_SHIFT:
+            self.current_guard_id = guard_id
+        elif action_type == SLEEPS:
+            self.asleep_since = minute
+        elif action_type == WAKES_UP:
+            self._add_nap(self.current_guard_id, self.asleep_since or 0,
+                          min(minute, self.minutes))
+            self.asleep_since = None
+
+    def _is_ahead(self, guard_id, other_guard_id):
+        # Ties go to the guard first seen waking up, same as the row
+        # order of get_sleep_matrix().
+        return self._guard_orders[guard_id] < \
+            self._guard_orders[other_guard_id]
+
+    def _add_nap(self, guard_id, sleeping_minute, waking_up_minute):
+        guard_sleep_times = self.guards_sleep_times.setdefault(
+            guard_id, [0] * self.minutes)
+        self._guard_orders.setdefault(guard_id, len(self._guard_orders))
+        sleepiest_minute = self.guards_sleepiest_minutes.get(guard_id, 0)
+        for minute in range(sleeping_minute, waking_up_minute):
+            guard_sleep_times[minute] += 1
+            count = guard_sleep_times[minute]
+            if count > guard_sleep_times[sleepiest_minute] or \
+                    (count == guard_sleep_times[sleepiest_minute] and
+                     minute < sleepiest_minute):
+                sleepiest_minute = minute
+            routine_count = 0 if self.routine_sleeper is None else \
+                self.guards_sleep_times[self.routine_sleeper][
+                    self.routine_minute]
+            if self.routine_sleeper is None or count > routine_count or \
+                    (count == routine_count and
+                     self._is_ahead(guard_id, self.routine_sleeper)):
+                self.routine_sleeper = guard_id
+                self.routine_minute = minute
+        self.guards_sleepiest_minutes[guard_id] = sleepiest_minute
+        if self.routine_sleeper == guard_id:
+            self.routine_minute = sleepiest_minute
+        total_sleep = self.guards_total_sleep.get(guard_id, 0) + \
+                      max(waking_up_minute - sleeping_minute, 0)
+        self.guards_total_sleep[guard_id] = total_sleep
+        heaviest_sleep = 0 if self.heaviest_sleeper is None else \
+            self.guards_total_sleep[self.heaviest_sleeper]
+        if self.heaviest_sleeper is None or total_sleep > heaviest_sleep or \
+                (total_sleep == heaviest_sleep and
+                 self._is_ahead(guard_id, self.heaviest_sleeper)):
+            self.heaviest_sleeper = guard_id
+
+    def get_heaviest_sleeper_minute(self):
+        """
+        Returns (heaviest_sleeper, sleepiest_minute), same as the
+        get_heaviest_sleeper_minute() function, from the applied lines.
+        """
+        if self.heaviest_sleeper is None:
+            return None
+        return (self.heaviest_sleeper,
+                self.guards_sleepiest_minutes[self.heaviest_sleeper])
+
+    def get_routine_sleeper_minute(self):
+        """
+        Returns (routine_sleeper, sleepiest_minute), same as the
+        get_routine_sleeper_minute() function, from the applied lines.
+        """
+        if self.routine_sleeper is None:
+            return None
+        return self.routine_sleeper, self.routine_minute
+
 def one():
-    security_actions = get_sorted_security_actions('day_four.txt')
-    guards_sleep_times = get_guards_sleep_times(security_actions)
-    heaviest_sleeper = get_heaviest_sleeper(guards_sleep_times)
-    sleepiest_minute = get_sleepiest_minute(guards_sleep_times, heaviest_sleeper)
+    security_actions = get_sorted_security_action_columns('day_four.txt')
+    sleep_matrix, guard_ids = get_sleep_matrix(security_actions)
+    heaviest_sleeper, sleepiest_minute = get_heaviest_sleeper_minute(
+        sleep_matrix, guard_ids)
     return heaviest_sleeper * sleepiest_minute
 
 def two():
-    security_actions = get_sorted_security_actions('day_four.txt')
-    guards_sleep_times = get_guards_sleep_times(security_actions)
-    routine_sleeper = get_routine_sleeper(guards_sleep_times)
-    sleepiest_minute = get_sleepiest_minute(guards_sleep_times, routine_sleeper)
+    security_actions = get_sorted_security_action_columns('day_four.txt')
+    sleep_matrix, guard_ids = get_sleep_matrix(security_actions)
+    routine_sleeper, sleepiest_minute = get_routine_sleeper_minute(
+        sleep_matrix, guard_ids)
     return routine_sleeper * sleepiest_minute
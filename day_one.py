@@ -1,29 +1,178 @@
+import mmap
 import os
 
+import numpy as np
+
 from config import DATA_DIR
+from loader import load_input
+
+PARSE_BLOCK_SIZE = 2 ** 21
+PLACE_VALUES = 10 ** np.arange(19, dtype=np.int64)
+
+def _load_frequency_changes(input_file_name):
+	return load_input(input_file_name, _parse_input_file, 'frequency_changes')
 
 def _get_input_list(input_file_name):
-	input_data_file = os.path.join(DATA_DIR, input_file_name)
-	with open(input_data_file, 'r') as fp:
-		input_data = [int(line) for line in fp]
+	input_data = _load_frequency_changes(input_file_name).tolist()
 	return input_data
 
+def get_frequency_sum(input_file_name):
+	"""
+	Returns the sum of the frequency changes in a file, reading it one
+	line at a time so that only the running sum is kept in memory.
+	"""
+	input_data_file = os.path.join(DATA_DIR, input_file_name)
+	frequency_sum = 0
+	with open(input_data_file, 'rb') as fp:
+		for line in fp:
+			if line.strip():
+				frequency_sum += int(line)
+	return frequency_sum
+
+def parse_signed_integers(input_data):
+	"""
+	Decodes newline separated signed integers, like "+12" or "-13", all
+	at once. Each digit is weighted by its place value in its line, and
+	the weighted digits are added up per line with np.add.reduceat().
+	The per byte intermediates are booleans and np.int32 line ids, so
+	parsing takes under 30 bytes of memory per input byte.
+
+	Inputs -
+		input_data - an np.uint8 array of the raw bytes of the lines,
+			fewer than 2 ** 31 of them.
+
+	Returns -
+		integers - an np.int64 array, with one value per non-empty line.
+	"""
+	is_newline = input_data == ord('\n')
+	is_digit = (input_data >= ord('0')) & (input_data <= ord('9'))
+	line_ids = np.cumsum(is_newline, dtype=np.int32)
+	line_ids -= is_newline
+	digit_line_ids = line_ids[is_digit]
+	negative_line_ids = line_ids[input_data == ord('-')]
+	if not len(digit_line_ids):
+		return np.zeros(0, dtype=np.int64)
+	is_line_start = np.ones(len(digit_line_ids), dtype=bool)
+	np.not_equal(digit_line_ids[1:], digit_line_ids[:-1],
+					out=is_line_start[1:])
+	line_starts = np.flatnonzero(is_line_start)
+	line_lengths = np.diff(np.append(line_starts, len(digit_line_ids)))
+	places = np.repeat((line_starts + line_lengths - 1).astype(np.int32),
+						line_lengths)
+	places -= np.arange(len(digit_line_ids), dtype=np.int32)
+	digit_values = (input_data[is_digit] - ord('0')).astype(np.int64)
+	digit_values *= PLACE_VALUES[places]
+	integers = np.add.reduceat(digit_values, line_starts)
+	integer_line_ids = digit_line_ids[line_starts]
+	negative_ixs = np.minimum(np.searchsorted(integer_line_ids,
+												negative_line_ids),
+								len(integer_line_ids) - 1)
+	is_negative = integer_line_ids[negative_ixs] == negative_line_ids
+	integers[negative_ixs[is_negative]] *= -1
+	return integers
+
+def _parse_input_file(input_data_file, block_size=PARSE_BLOCK_SIZE):
+	"""
+	Returns all the frequency changes in a file as an np.int64 array.
+	The file is memory-mapped and parsed block_size bytes (rounded up
+	to the end of a line) at a time with parse_signed_integers().
+	"""
+	if not os.path.getsize(input_data_file):
+		return np.zeros(0, dtype=np.int64)
+	parsed_blocks = []
+	with open(input_data_file, 'rb') as fp, \
+			mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as input_map:
+		block_start = 0
+		while block_start < len(input_map):
+			block_end = input_map.find(b'\n', min(block_start + block_size,
+												len(input_map)))
+			block_end = len(input_map) if block_end == -1 else block_end + 1
+			input_data = np.frombuffer(input_map[block_start: block_end],
+										dtype=np.uint8)
+			parsed_blocks.append(parse_signed_integers(input_data))
+			block_start = block_end
+	return np.concatenate(parsed_blocks)
+
+def get_frequency_changes(input_file_name, block_size=PARSE_BLOCK_SIZE):
+	"""
+	Returns all the frequency changes in a file in DATA_DIR as an
+	np.int64 array, parsing the file afresh with _parse_input_file().
+	"""
+	input_data_file = os.path.join(DATA_DIR, input_file_name)
+	return _parse_input_file(input_data_file, block_size)
+
 def one():
-	input_data = _get_input_list('day_one.txt')
-	return sum(input_data)
+	"""
+	Only the running sum is needed, so the file is streamed with
+	get_frequency_sum() in constant memory. The cached array from
+	load_input() saves the parsing on later runs, but holds every
+	change in memory, so it is only used by two(), which needs them all.
+	"""
+	return get_frequency_sum('day_one.txt')
 
-def two():
-	input_data = _get_input_list('day_one.txt')
-	reached_values = [0]
+def get_first_repeated_frequency(changes):
+	"""
+	Applies the frequency changes over and over, starting from 0, and
+	returns the first frequency that is reached twice. The reached
+	frequencies are kept in a set, so each step takes constant time.
+	This never returns if no frequency is ever repeated; use
+	get_first_repeated_frequency_analytic() for such inputs.
+	"""
+	reached_values = {0}
 	current_value = 0
-	overall_idx = 0
-	data_len = len(input_data)
 	while True:
-		current_idx = overall_idx % data_len
-		current_value += input_data[current_idx]
-		if not current_value in reached_values:
-			reached_values.append(current_value)
-			overall_idx += 1
-		else:
-			break
-	return current_value
+		for change in changes:
+			current_value += change
+			if current_value in reached_values:
+				return current_value
+			reached_values.add(current_value)
+
+def get_first_repeated_frequency_analytic(changes):
+	"""
+	Returns the first frequency that is reached twice, without
+	simulating the repeated cycles of changes, or None if no frequency
+	is ever repeated.
+
+	After every cycle, all the frequencies of the first cycle are shifted
+	by the cycle's total. So a frequency of the first cycle can only be
+	reached again from frequencies that leave the same remainder when
+	divided by the total, and the nearest of those in the direction of
+	the drift reaches it the soonest.
+
+	Inputs -
+		changes - a list of ints, the frequency changes.
+
+	Returns -
+		repeated_value - int, the first frequency that is reached twice,
+			or None if there isn't one.
+	"""
+	reached_values = {}
+	current_value = 0
+	for step, change in enumerate(changes):
+		if current_value in reached_values:
+			return current_value
+		reached_values[current_value] = step
+		current_value += change
+	total = current_value
+	if total == 0:
+		return 0 if changes else None
+	residue_groups = {}
+	for value, step in reached_values.items():
+		residue_groups.setdefault(value % abs(total), []).append(value)
+	first_repeat = None
+	for values in residue_groups.values():
+		values.sort(reverse=total < 0)
+		for value, next_value in zip(values, values[1:]):
+			cycles = (next_value - value) // total
+			repeat_step = reached_values[value] + cycles * len(changes)
+			if first_repeat is None or repeat_step < first_repeat[0]:
+				first_repeat = (repeat_step, next_value)
+	if first_repeat is None:
+		return None
+	return first_repeat[1]
+
+def two(analytic=True):
+	input_data = _get_input_list('day_one.txt')
+	if analytic:
+		return get_first_repeated_frequency_analytic(input_data)
+	return get_first_repeated_frequency(input_data)
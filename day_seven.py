@@ -1,12 +1,14 @@
-import os
+import heapq
 import string
 
-import networkx as nx
 import numpy as np
 
-from collections import defaultdict
+from array import array
+from collections import defaultdict, deque
+from functools import partial
 
-from config import DATA_DIR
+from loader import load_input
+from parallel import map_with_fallback
 
 def get_instructions(input_file_name):
     """
@@ -23,19 +25,157 @@ def get_instructions(input_file_name):
         instructions - a list of tuples, each tuple of the format:
             (task, prerequisite)
     """
+    instructions = load_input(input_file_name, _parse_input_file,
+                              'instructions')
+    return [tuple(instruction) for instruction in instructions.tolist()]
+
+def _parse_input_file(input_data_file):
+    """
+    Parses the instructions in a file into an np.array of strings, of
+    shape (number of instructions, 2), each row being
+    (task, prerequisite).
+    """
     def _parse_instruction(instruction_line):
         return (instruction_line[-3], instruction_line[1])
 
-    input_data_file = os.path.join(DATA_DIR, input_file_name)
     with open(input_data_file, 'r') as fp:
         instructions = [_parse_instruction(line.strip().split())
-                        for line in fp]
-    return instructions
+                        for line in fp if line.strip()]
+    return np.array(instructions, dtype=str).reshape(-1, 2)
+
+def get_task_graph(instructions, tasks=()):
+    """
+    Builds and returns a compact representation of the task graph,
+    without networkx. The tasks are numbered in sorted order, and the
+    dependents of every task are stored contiguously in a single array,
+    with dependent_offsets[i]: dependent_offsets[i + 1] being the slice
+    of the dependents of task i.
+
+    Input -
+        instructions - a list of tuples, each tuple is of the format
+            (task, prerequisite).
+        tasks - an iterable of any more tasks, that have no
+            instructions.
+
+    Returns -
+        task_graph - a dict with ['tasks', 'task_ids',
+            'dependent_offsets', 'dependents', 'prerequisite_counts']
+            as the keys.
+    """
+    instructions = set(instructions)
+    tasks = sorted({task for instruction in instructions
+                    for task in instruction} | set(tasks))
+    task_ids = {task: task_id for task_id, task in enumerate(tasks)}
+    dependent_counts = array('l', [0] * len(tasks))
+    prerequisite_counts = array('l', [0] * len(tasks))
+    for task, prerequisite in instructions:
+        dependent_counts[task_ids[prerequisite]] += 1
+        prerequisite_counts[task_ids[task]] += 1
+    dependent_offsets = array('l', [0] * (len(tasks) + 1))
+    for task_id, dependent_count in enumerate(dependent_counts):
+        dependent_offsets[task_id + 1] = dependent_offsets[task_id] + \
+                                         dependent_count
+    dependents = array('l', [0] * len(instructions))
+    next_positions = dependent_offsets[:-1]
+    for task, prerequisite in sorted(instructions):
+        prerequisite_id = task_ids[prerequisite]
+        dependents[next_positions[prerequisite_id]] = task_ids[task]
+        next_positions[prerequisite_id] += 1
+    task_graph = {
+        'tasks': tasks,
+        'task_ids': task_ids,
+        'dependent_offsets': dependent_offsets,
+        'dependents': dependents,
+        'prerequisite_counts': prerequisite_counts,
+    }
+    return task_graph
+
+def _get_ordered_task_ids(task_graph):
+    """
+    Returns the ids of the tasks in the order in which they need to be
+    executed, picking the alphabetically first of the ready tasks at
+    every step. Raises a ValueError if the dependencies form a cycle.
+    """
+    tasks = task_graph['tasks']
+    dependent_offsets = task_graph['dependent_offsets']
+    dependents = task_graph['dependents']
+    prerequisite_counts = array('l', task_graph['prerequisite_counts'])
+    ready_tasks = [task_id for task_id, prerequisite_count
+                   in enumerate(prerequisite_counts) if not prerequisite_count]
+    heapq.heapify(ready_tasks)
+    ordered_task_ids = []
+    while ready_tasks:
+        task_id = heapq.heappop(ready_tasks)
+        ordered_task_ids.append(task_id)
+        for dependent_id in dependents[dependent_offsets[task_id]:
+                                       dependent_offsets[task_id + 1]]:
+            prerequisite_counts[dependent_id] -= 1
+            if not prerequisite_counts[dependent_id]:
+                heapq.heappush(ready_tasks, dependent_id)
+    _check_all_ordered(tasks, ordered_task_ids, prerequisite_counts)
+    return ordered_task_ids
+
+def _get_topological_task_ids(task_graph):
+    """
+    Returns the ids of the tasks in a topological order, in O(V + E)
+    time, taking the ready tasks first in first out rather than
+    alphabetically. Raises a ValueError if the dependencies form a
+    cycle.
+    """
+    tasks = task_graph['tasks']
+    dependent_offsets = task_graph['dependent_offsets']
+    dependents = task_graph['dependents']
+    prerequisite_counts = array('l', task_graph['prerequisite_counts'])
+    ready_tasks = deque(task_id for task_id, prerequisite_count
+                        in enumerate(prerequisite_counts)
+                        if not prerequisite_count)
+    ordered_task_ids = []
+    while ready_tasks:
+        task_id = ready_tasks.popleft()
+        ordered_task_ids.append(task_id)
+        for dependent_id in dependents[dependent_offsets[task_id]:
+                                       dependent_offsets[task_id + 1]]:
+            prerequisite_counts[dependent_id] -= 1
+            if not prerequisite_counts[dependent_id]:
+                ready_tasks.append(dependent_id)
+    _check_all_ordered(tasks, ordered_task_ids, prerequisite_counts)
+    return ordered_task_ids
+
+def _check_all_ordered(tasks, ordered_task_ids, prerequisite_counts):
+    if len(ordered_task_ids) < len(tasks):
+        blocked_tasks = [task for task, prerequisite_count
+                         in zip(tasks, prerequisite_counts)
+                         if prerequisite_count]
+        raise ValueError('The dependencies of the tasks form a cycle '
+                         'among: {}'.format(''.join(blocked_tasks)))
+
+def get_task_graph_order(task_graph):
+    """
+    Returns the order in which the tasks need to be executed, picking
+    the alphabetically first of the ready tasks at every step. The
+    ready tasks are kept in a min-heap, and every task's count of
+    unfinished prerequisites is decremented as they finish, so this
+    takes O((V + E) log V) time. The task graph is left untouched.
+
+    Input -
+        task_graph - a dict, as returned by get_task_graph().
+
+    Returns -
+        tasks_order - a string which specifies the order in which the
+            tasks need to be executed.
+
+    Raises -
+        ValueError - if the dependencies of the tasks form a cycle.
+    """
+    tasks = task_graph['tasks']
+    return ''.join(tasks[task_id]
+                   for task_id in _get_ordered_task_ids(task_graph))
 
 def get_tasks_order(graph):
     """
     Takes in the requirements of tasks and returns the order in which
-    the tasks need to be executed.
+    the tasks need to be executed. Unlike before, the graph is no
+    longer consumed in the process.
 
     Input -
         graph - a networkx directed graph representing the tasks and
@@ -46,17 +186,8 @@ def get_tasks_order(graph):
         tasks_order - a string which specifies the order in which the
             tasks need to be executed.
     """
-    tasks_order = ""
-    tasks = [task for task in graph.nodes]
-    tasks.sort()
-    while tasks:
-        for task in tasks:
-            if not graph[task]:
-                tasks_order += task
-                tasks.remove(task)
-                graph.remove_node(task)
-                break
-    return tasks_order
+    task_graph = get_task_graph(graph.edges, graph.nodes)
+    return get_task_graph_order(task_graph)
 
 def get_instructions_graph(instructions):
     """
@@ -71,6 +202,8 @@ def get_instructions_graph(instructions):
             their dependencies. An edge from X to Y signifies that Y
             is a prerequisite for X.
     """
+    import networkx as nx
+
     graph = nx.DiGraph()
     graph.add_edges_from(instructions)
     return graph
@@ -83,18 +216,264 @@ def get_task_times(graph, extra_time):
     Inputs -
         graph - a networkx directed graph representing the tasks and
             their dependencies. An edge from X to Y signifies that Y
-            is a prerequisite for X.
+            is a prerequisite for X. A task graph, as returned by
+            get_task_graph(), works too.
         extra_time - int, a minimum common time taken for every task
             (in seconds).
 
     Returns - 
         task_times - a dict with tasks as keys and the respective times
-            taken for their completion as values.
+            taken for their completion as values, extra_time plus the
+            position of the first letter of each task in the alphabet.
+
+    Raises -
+        KeyError - if a task doesn't start with an uppercase letter.
     """
-    tasks = [task for task in graph.nodes]
-    task_times = {task: ord(task) - 64 + extra_time for task in tasks}
+    if isinstance(graph, dict):
+        tasks = graph['tasks']
+    else:
+        tasks = [task for task in graph.nodes]
+    task_times = {task: _get_task_time(task) + extra_time for task in tasks}
     return task_times
 
+def _get_task_time(task):
+    """
+    Returns the time taken by a task by default, the position of its
+    first letter in the alphabet, so that "A" takes 1 second and "Z" 26.
+    Generated tasks named like "A0" and "A1" take as long as "A".
+
+    Raises -
+        KeyError - if the task doesn't start with an uppercase letter,
+            in which case its time has to be given in task_times.
+    """
+    if not task or task[0] not in string.ascii_uppercase:
+        raise KeyError('No default time for task {!r}; give its time in '
+                       'task_times'.format(task))
+    return ord(task[0]) - 64
+
+def _get_durations(task_graph, task_times):
+    """
+    Returns a list with the time taken by each task, indexed by task
+    id; any task missing in task_times takes _get_task_time(task)
+    seconds.
+    """
+    return [task_times[task] if task in task_times else _get_task_time(task)
+            for task in task_graph['tasks']]
+
+def simulate_workers(task_graph, task_times, workers, trace=False):
+    """
+    Simulates the workers working through the tasks, where every free
+    worker picks up the alphabetically first of the ready tasks. Only
+    the moments at which tasks finish are simulated, with the running
+    tasks kept in a min-heap of their completion times, so this takes
+    O(V + E) memory irrespective of how long the tasks take.
+
+    Inputs -
+        task_graph - a dict, as returned by get_task_graph().
+        task_times - dict, of format {task: time taken}; any task
+            missing in it takes as long as _get_task_time(task), the
+            position of its first letter in the alphabet.
+        workers - int, number of workers working on the whole project.
+        trace - bool, whether to also return the schedule followed.
+
+    Returns -
+        overall_time - int, the overall time in seconds in which the
+            work would be completed.
+        schedule - only if trace is True; a list with one list per
+            worker, of the (task, start_time, end_time) tuples of the
+            tasks done by that worker, in order.
+
+    Raises -
+        ValueError - if the dependencies of the tasks form a cycle.
+        KeyError - if a task missing in task_times has no default time.
+    """
+    tasks = task_graph['tasks']
+    dependent_offsets = task_graph['dependent_offsets']
+    dependents = task_graph['dependents']
+    prerequisite_counts = array('l', task_graph['prerequisite_counts'])
+    durations = _get_durations(task_graph, task_times)
+    ready_tasks = [task_id for task_id, prerequisite_count
+                   in enumerate(prerequisite_counts) if not prerequisite_count]
+    heapq.heapify(ready_tasks)
+    free_workers = list(range(workers))
+    running_tasks = []
+    schedule = [[] for _ in range(workers)]
+    current_time = 0
+    finished_count = 0
+    while ready_tasks or running_tasks:
+        while ready_tasks and free_workers:
+            task_id = heapq.heappop(ready_tasks)
+            worker = heapq.heappop(free_workers)
+            end_time = current_time + durations[task_id]
+            heapq.heappush(running_tasks, (end_time, task_id, worker))
+            if trace:
+                schedule[worker].append((tasks[task_id], current_time,
+                                         end_time))
+        if not running_tasks:
+            break
+        current_time = running_tasks[0][0]
+        while running_tasks and running_tasks[0][0] == current_time:
+            _, task_id, worker = heapq.heappop(running_tasks)
+            heapq.heappush(free_workers, worker)
+            finished_count += 1
+            for dependent_id in dependents[dependent_offsets[task_id]:
+                                           dependent_offsets[task_id + 1]]:
+                prerequisite_counts[dependent_id] -= 1
+                if not prerequisite_counts[dependent_id]:
+                    heapq.heappush(ready_tasks, dependent_id)
+    if finished_count < len(tasks):
+        raise ValueError('The dependencies of the tasks form a cycle')
+    if trace:
+        return current_time, schedule
+    return current_time
+
+def get_task_graph_analysis(task_graph, task_times):
+    """
+    Analyses the timing of the tasks without simulating the workers,
+    with a single forward and backward pass over the tasks in
+    topological order, which take O(V + E) time. Only counting the
+    tasks running at once sorts their start and end times.
+
+    Inputs -
+        task_graph - a dict, as returned by get_task_graph().
+        task_times - dict, of format {task: time taken}.
+
+    Returns -
+        analysis - a dict with the following keys,
+            'earliest_start_times' - dict, of format {task: est}, the
+                earliest each task can start with unlimited workers.
+            'slacks' - dict, of format {task: slack}, how long each
+                task can be delayed without delaying the whole project.
+            'critical_path' - list, the tasks of a longest chain of
+                dependent tasks.
+            'critical_path_time' - int, the total time of that chain,
+                which no number of workers can beat.
+            'total_time' - int, the time taken by all the tasks.
+            'sufficient_workers' - int, the most tasks running at once
+                when every task starts at its earliest start time. With
+                at least as many workers, the overall time is always
+                critical_path_time, so adding more workers can't help.
+                It is only an upper bound on the fewest workers that
+                reach critical_path_time, which can be fewer; see
+                get_saturation_workers() for that.
+
+    Raises -
+        ValueError - if the dependencies of the tasks form a cycle.
+    """
+    tasks = task_graph['tasks']
+    dependent_offsets = task_graph['dependent_offsets']
+    dependents = task_graph['dependents']
+    durations = _get_durations(task_graph, task_times)
+    ordered_task_ids = _get_topological_task_ids(task_graph)
+
+    earliest_starts = [0] * len(tasks)
+    critical_prerequisites = [None] * len(tasks)
+    for task_id in ordered_task_ids:
+        end_time = earliest_starts[task_id] + durations[task_id]
+        for dependent_id in dependents[dependent_offsets[task_id]:
+                                       dependent_offsets[task_id + 1]]:
+            if end_time > earliest_starts[dependent_id] or \
+                    critical_prerequisites[dependent_id] is None:
+                earliest_starts[dependent_id] = max(
+                    earliest_starts[dependent_id], end_time)
+                critical_prerequisites[dependent_id] = task_id
+    end_times = [earliest_start + duration for earliest_start, duration
+                 in zip(earliest_starts, durations)]
+    critical_path_time = max(end_times, default=0)
+
+    latest_ends = [critical_path_time] * len(tasks)
+    for task_id in reversed(ordered_task_ids):
+        for dependent_id in dependents[dependent_offsets[task_id]:
+                                       dependent_offsets[task_id + 1]]:
+            latest_start = latest_ends[dependent_id] - durations[dependent_id]
+            latest_ends[task_id] = min(latest_ends[task_id], latest_start)
+
+    critical_path = []
+    if tasks:
+        task_id = end_times.index(critical_path_time)
+        while task_id is not None:
+            critical_path.append(tasks[task_id])
+            task_id = critical_prerequisites[task_id]
+        critical_path.reverse()
+
+    # A task that takes no time still holds a worker at its start time,
+    # so its end is only counted after all the starts at that time.
+    running_changes = sorted(
+        [(earliest_start, 1, 1) for earliest_start in earliest_starts] +
+        [(end_time, 0 if duration else 2, -1)
+         for end_time, duration in zip(end_times, durations)])
+    sufficient_workers = running_tasks = 0
+    for _, _, change in running_changes:
+        running_tasks += change
+        sufficient_workers = max(sufficient_workers, running_tasks)
+
+    analysis = {
+        'earliest_start_times': dict(zip(tasks, earliest_starts)),
+        'slacks': {task: latest_end - end_time for task, latest_end, end_time
+                   in zip(tasks, latest_ends, end_times)},
+        'critical_path': critical_path,
+        'critical_path_time': critical_path_time,
+        'total_time': sum(durations),
+        'sufficient_workers': max(sufficient_workers, 1),
+    }
+    return analysis
+
+def get_time_of_completion_bounds(analysis, workers):
+    """
+    Returns the bounds on the overall time taken by the given number of
+    workers, as simulated by simulate_workers(). The work can't be done
+    faster than its critical path, or than the total time shared
+    equally among the workers. And as the workers never idle while a
+    task is ready, it can't take longer than Graham's bound of
+    total_time / workers + (1 - 1 / workers) * critical_path_time.
+
+    Inputs -
+        analysis - a dict, as returned by get_task_graph_analysis().
+        workers - int, number of workers working on the whole project.
+
+    Returns -
+        (lower_bound, upper_bound) - ints, in seconds.
+    """
+    critical_path_time = analysis['critical_path_time']
+    total_time = analysis['total_time']
+    lower_bound = max(critical_path_time, -(-total_time // workers))
+    upper_bound = (total_time + (workers - 1) * critical_path_time) // \
+                  workers
+    if workers >= analysis['sufficient_workers']:
+        upper_bound = critical_path_time
+    return lower_bound, max(lower_bound, upper_bound)
+
+def get_saturation_workers(task_graph, task_times, analysis=None):
+    """
+    Returns the fewest workers past which adding more workers no longer
+    reduces the overall time, as simulated by simulate_workers(). With
+    analysis['sufficient_workers'] workers or more the overall time is
+    always critical_path_time, so only the worker counts up to it are
+    simulated, with get_times_of_completion(). The overall time isn't
+    always monotonic in the number of workers, so the count returned is
+    the fewest from which every count up reaches critical_path_time.
+
+    Inputs -
+        task_graph - a dict, as returned by get_task_graph().
+        task_times - dict, of format {task: time taken}.
+        analysis - a dict, as returned by get_task_graph_analysis() for
+            the same tasks; it is computed if not given.
+
+    Returns -
+        saturation_workers - int, the number of workers.
+    """
+    if analysis is None:
+        analysis = get_task_graph_analysis(task_graph, task_times)
+    sufficient_workers = analysis['sufficient_workers']
+    times_of_completion = get_times_of_completion(
+        task_graph, task_times, range(1, sufficient_workers + 1))
+    saturation_workers = sufficient_workers
+    while saturation_workers > 1 and \
+            times_of_completion[saturation_workers - 1] == \
+            analysis['critical_path_time']:
+        saturation_workers -= 1
+    return saturation_workers
+
 def get_time_of_completion(graph, task_times, workers):
     """
     Inputs -
@@ -108,84 +487,450 @@ def get_time_of_completion(graph, task_times, workers):
         overall_time - int, the overall time in seconds in which the
             work would be completed.
     """
-    def _get_earliest_start_times(graph, task_times):
+    task_graph = get_task_graph(graph.edges, graph.nodes)
+    overall_time = simulate_workers(task_graph, task_times, workers)
+    return overall_time
+
+def _get_simulation_state(task_graph):
+    prerequisite_counts = array('l', task_graph['prerequisite_counts'])
+    ready_tasks = [task_id for task_id, prerequisite_count
+                   in enumerate(prerequisite_counts) if not prerequisite_count]
+    heapq.heapify(ready_tasks)
+    simulation_state = {
+        'current_time': 0,
+        'ready_tasks': ready_tasks,
+        'running_tasks': [],
+        'prerequisite_counts': prerequisite_counts,
+        'finished_count': 0,
+    }
+    return simulation_state
+
+def _copy_simulation_state(simulation_state):
+    return {
+        'current_time': simulation_state['current_time'],
+        'ready_tasks': list(simulation_state['ready_tasks']),
+        'running_tasks': list(simulation_state['running_tasks']),
+        'prerequisite_counts': array('l',
+                                     simulation_state['prerequisite_counts']),
+        'finished_count': simulation_state['finished_count'],
+    }
+
+def _resume_simulation(task_graph, durations, simulation_state, workers):
+    """
+    Runs a simulation from the given state to the end, the same way as
+    simulate_workers() does, and returns the overall time along with a
+    copy of the state at the first moment that a ready task had to wait
+    for a free worker (or None if that never happened).
+    """
+    dependent_offsets = task_graph['dependent_offsets']
+    dependents = task_graph['dependents']
+    current_time = simulation_state['current_time']
+    ready_tasks = simulation_state['ready_tasks']
+    running_tasks = simulation_state['running_tasks']
+    prerequisite_counts = simulation_state['prerequisite_counts']
+    finished_count = simulation_state['finished_count']
+    contention_state = None
+    while ready_tasks or running_tasks:
+        if contention_state is None and \
+                len(ready_tasks) > workers - len(running_tasks):
+            simulation_state['current_time'] = current_time
+            simulation_state['finished_count'] = finished_count
+            contention_state = _copy_simulation_state(simulation_state)
+        while ready_tasks and len(running_tasks) < workers:
+            task_id = heapq.heappop(ready_tasks)
+            heapq.heappush(running_tasks,
+                           (current_time + durations[task_id], task_id))
+        if not running_tasks:
+            break
+        current_time = running_tasks[0][0]
+        while running_tasks and running_tasks[0][0] == current_time:
+            _, task_id = heapq.heappop(running_tasks)
+            finished_count += 1
+            for dependent_id in dependents[dependent_offsets[task_id]:
+                                           dependent_offsets[task_id + 1]]:
+                prerequisite_counts[dependent_id] -= 1
+                if not prerequisite_counts[dependent_id]:
+                    heapq.heappush(ready_tasks, dependent_id)
+    if finished_count < len(task_graph['tasks']):
+        raise ValueError('The dependencies of the tasks form a cycle')
+    return current_time, contention_state
+
+def get_times_of_completion(task_graph, task_times, worker_counts):
+    """
+    Returns the overall time taken for each of the worker counts. With
+    more workers, a simulation goes exactly the same way as with fewer
+    workers until the first moment that the fewer workers run out. So
+    the worker counts are simulated in increasing order, each resuming
+    from that moment in the previous simulation instead of from the
+    start; and once the workers never run out, the rest of the worker
+    counts take the same time.
+
+    Inputs -
+        task_graph - a dict, as returned by get_task_graph().
+        task_times - dict, of format {task: time taken}.
+        worker_counts - an iterable of ints.
+
+    Returns -
+        times_of_completion - dict, of format {workers: overall_time}.
+    """
+    durations = _get_durations(task_graph, task_times)
+    simulation_state = _get_simulation_state(task_graph)
+    times_of_completion = {}
+    overall_time = None
+    for workers in sorted(set(worker_counts)):
+        if simulation_state is not None:
+            overall_time, simulation_state = _resume_simulation(
+                task_graph, durations, simulation_state, workers)
+        times_of_completion[workers] = overall_time
+    return times_of_completion
+
+_sweep_task_graph = None
+
+def _set_sweep_task_graph(task_graph):
+    global _sweep_task_graph
+    _sweep_task_graph = task_graph
+
+def _get_sweep_times(extra_time, worker_counts):
+    task_times = get_task_times(_sweep_task_graph, extra_time)
+    return extra_time, get_times_of_completion(_sweep_task_graph, task_times,
+                                               worker_counts)
+
+def iter_times_of_completion(input_file_name, worker_counts, extra_times,
+                             processes=None):
+    """
+    Yields the overall time taken for every combination of the worker
+    counts and extra times, as (workers, extra_time, overall_time)
+    tuples, in the order in which they are completed. The instructions
+    are parsed only once, and the task graph is handed to each process
+    of the pool once, when it starts. Each process simulates all the
+    worker counts for one extra time with get_times_of_completion().
+
+    Inputs -
+        input_file_name - the name of the input file
+        worker_counts - an iterable of ints.
+        extra_times - an iterable of ints.
+        processes - int, the number of worker processes, as in
+            map_with_fallback().
+    """
+    instructions = get_instructions(input_file_name)
+    task_graph = get_task_graph(instructions)
+    worker_counts = sorted(set(worker_counts))
+    sweeps = map_with_fallback(
+        partial(_get_sweep_times, worker_counts=worker_counts),
+        dict.fromkeys(extra_times), processes=processes,
+        initializer=_set_sweep_task_graph, initargs=(task_graph,),
+        ordered=False)
+    try:
+        for extra_time, times_of_completion in sweeps:
+            for workers, overall_time in times_of_completion.items():
+                yield workers, extra_time, overall_time
+    finally:
+        _set_sweep_task_graph(None)
+
+def get_times_of_completion_table(input_file_name, worker_counts,
+                                  extra_times, processes=None):
+    """
+    Returns the overall time taken for every combination of the worker
+    counts and extra times, as a dict of format
+    {(workers, extra_time): overall_time}. Same as
+    iter_times_of_completion(), but collected into a table.
+    """
+    times_of_completion = iter_times_of_completion(
+        input_file_name, worker_counts, extra_times, processes)
+    return {(workers, extra_time): overall_time
+            for workers, extra_time, overall_time in times_of_completion}
+
+class IncrementalTaskGraph:
+    """
+    Keeps the order of the tasks and their earliest start times up to
+    date as instructions are added and removed, so that neither needs
+    the whole graph to be rebuilt after every change.
+
+    The order is the same as get_task_graph_order()'s, where the
+    alphabetically first of the ready tasks is picked at every step. A
+    change can only affect that order from the first step at which the
+    changed task's readiness differs, so only the steps from there on
+    are redone. The earliest start times are then updated from the
+    changed task onwards, in order, stopping wherever they don't change.
+    An instruction that would form a cycle is refused with a ValueError,
+    leaving the graph as it was.
+
+    Only the order and the unlimited-worker critical path are kept up
+    to date incrementally. The time of completion with a limited number
+    of workers is simulated over a compact task graph which is rebuilt
+    on the first such query after a change, and reused until the next.
+
+    Usage -
+        task_graph = IncrementalTaskGraph(get_instructions('day_seven.txt'))
+        task_graph.add_instruction('Q', 'A')
+        task_graph.remove_instruction('Q', 'A')
+        task_graph.get_tasks_order(), task_graph.get_critical_path_time()
+    """
+
+    def __init__(self, instructions=(), task_times=None):
+        self.task_times = dict(task_times or {})
+        self.prerequisites = defaultdict(set)
+        self.dependents = defaultdict(set)
+        self._durations = {}
+        self._order = []
+        self._positions = {}
+        self._earliest_starts = {}
+        self._end_times = []
+        self._task_graph = None
+        instructions = set(instructions)
+        for task, prerequisite in instructions:
+            self.prerequisites[task].add(prerequisite)
+            self.dependents[prerequisite].add(task)
+        task_graph = get_task_graph(instructions)
+        tasks = task_graph['tasks']
+        for task in tasks:
+            self._add_task_data(task)
+        self._order = [tasks[task_id]
+                       for task_id in _get_ordered_task_ids(task_graph)]
+        self._positions = {task: position
+                           for position, task in enumerate(self._order)}
+        self._update_earliest_starts(self._order)
+
+    @property
+    def tasks(self):
+        return sorted(self._positions)
+
+    @property
+    def instructions(self):
+        return sorted((task, prerequisite)
+                      for task, prerequisites in self.prerequisites.items()
+                      for prerequisite in prerequisites)
+
+    def _add_task_data(self, task):
+        self._durations[task] = self.task_times[task] \
+            if task in self.task_times else _get_task_time(task)
+        self._earliest_starts[task] = 0
+
+    def add_task(self, task):
         """
-        Inputs -
-            graph, task_times - as obtained by parent function.
+        Adds a task with no instructions, if it isn't there already.
+        """
+        if task in self._positions:
+            return
+        self._add_task_data(task)
+        self._task_graph = None
+        self._positions[task] = len(self._order)
+        self._order.append(task)
+        # The task is ready from the start, so it is picked at the first
+        # step at which the task picked before was alphabetically later.
+        for position, ordered_task in enumerate(self._order):
+            if ordered_task > task:
+                self._reorder_from(position)
+                break
+        self._set_end_time(task)
 
-        Returns -
-            earliest_start_times - dict, of format {task: est}
+    def _reorder_from(self, start_position):
         """
-        def _get_est(task):
-            """
-            Returns the earliest starting time possible for a task.
-            """
-            est = 0
-            if not graph[task]:
-                return est
-            for dependent_task in graph[task]:
-                est += task_times[dependent_task] + _get_est(dependent_task)
-            return est
+        Redoes the steps of picking the alphabetically first ready task,
+        from start_position onwards. The steps before it are unaffected,
+        so the tasks ordered before it count as done.
+        """
+        remaining_tasks = set(self._order[start_position:])
+        prerequisite_counts = {
+            task: len(self.prerequisites[task] & remaining_tasks)
+            for task in remaining_tasks}
+        ready_tasks = [task for task in remaining_tasks
+                       if not prerequisite_counts[task]]
+        heapq.heapify(ready_tasks)
+        position = start_position
+        while ready_tasks:
+            task = heapq.heappop(ready_tasks)
+            self._order[position] = task
+            self._positions[task] = position
+            position += 1
+            for dependent in self.dependents[task]:
+                prerequisite_counts[dependent] -= 1
+                if not prerequisite_counts[dependent]:
+                    heapq.heappush(ready_tasks, dependent)
 
-        tasks = [task for task in graph.nodes]
-        earliest_start_times = {task: _get_est(task) for task in tasks}
-        return earliest_start_times
-
-    def _get_task_queues(graph, task_times, workers):
-        """
-        Inputs - same as the parent function(get_time_of_completion()).
-
-        Returns -
-            task_queues - np.charrarray, represents which task each
-                worker is working on at any given second; of the shape
-                (maximum_time, workers).
-        """
-        def _get_free_worker(task):
-            try:
-                est = graph.nodes[task]['est']
-            except KeyError:
-                return work_till_times.argmin()
-            else:
-                temp_work_till_times = work_till_times.copy()
-                temp_work_till_times[temp_work_till_times < est] = est
-                return temp_work_till_times.argmin()
-
-        maximum_time = sum(task_times.values())
-        task_queues = np.chararray((maximum_time, workers))
-        work_till_times = np.zeros(workers)
-        reverse_graph = graph.reverse()
-        task_queues[:] = b'-'
-        while graph.nodes:
-            ready_tasks = [task for task in graph.nodes if not graph[task]]
-            ready_tasks.sort(key=lambda x: graph.nodes[x].get('est', 0))
-            for task in ready_tasks:
-                worker= _get_free_worker(task)
-                start_time = graph.nodes[task].get('est', work_till_times[worker])
-                end_time = start_time + graph.nodes[task]['duration']
-                work_till_times[worker] = end_time
-                for dependent_task in reverse_graph[task]:
-                    est = graph.nodes[dependent_task].get('est', 0)
-                    if end_time > est:
-                        graph.nodes[dependent_task]['est'] = end_time
-                task_queues[int(start_time): int(end_time), worker] = task
-                graph.remove_node(task)
-        return task_queues
-    task_queues = _get_task_queues(graph, task_times, workers)
-    tasks_per_second = (task_queues != b'-').sum(axis=1)
-    overall_time = (tasks_per_second > 0).sum()
-    return overall_time
+    def _find_path(self, task, other_task):
+        """
+        Returns the tasks on a path of dependents from task to
+        other_task, or None if other_task doesn't depend on task. Only
+        the tasks ordered between the two can be on such a path.
+        """
+        end_position = self._positions[other_task]
+        previous_tasks = {task: None}
+        tasks_to_visit = [task]
+        while tasks_to_visit:
+            current_task = tasks_to_visit.pop()
+            if current_task == other_task:
+                path = []
+                while current_task is not None:
+                    path.append(current_task)
+                    current_task = previous_tasks[current_task]
+                return path[::-1]
+            for dependent in self.dependents[current_task]:
+                if dependent not in previous_tasks and \
+                        self._positions[dependent] <= end_position:
+                    previous_tasks[dependent] = current_task
+                    tasks_to_visit.append(dependent)
+        return None
+
+    def add_instruction(self, task, prerequisite):
+        """
+        Adds an instruction that prerequisite must be finished before
+        task can begin, adding either task if it is new.
+
+        Raises -
+            ValueError - if the instruction would form a cycle, in which
+                case it isn't added.
+        """
+        if task == prerequisite:
+            raise ValueError('The instruction ({0}, {0}) would form a cycle'
+                             .format(task))
+        if prerequisite in self.prerequisites[task]:
+            return
+        self.add_task(task)
+        self.add_task(prerequisite)
+        task_position = self._positions[task]
+        if self._positions[prerequisite] > task_position:
+            path = self._find_path(task, prerequisite)
+            if path is not None:
+                raise ValueError(
+                    'The instruction ({}, {}) would form a cycle: {}'.format(
+                        task, prerequisite, ' -> '.join(path + [task])))
+        self.prerequisites[task].add(prerequisite)
+        self.dependents[prerequisite].add(task)
+        self._task_graph = None
+        # An order that already has the prerequisite first stays the same.
+        if self._positions[prerequisite] > task_position:
+            self._reorder_from(task_position)
+        self._update_earliest_starts([task])
+
+    def add_instructions(self, instructions):
+        for task, prerequisite in instructions:
+            self.add_instruction(task, prerequisite)
+
+    def remove_instruction(self, task, prerequisite):
+        """
+        Removes the instruction that prerequisite must be finished
+        before task can begin. Both the tasks are kept.
+
+        Raises -
+            ValueError - if there is no such instruction.
+        """
+        if prerequisite not in self.prerequisites[task]:
+            raise ValueError('No such instruction: ({}, {})'.format(
+                task, prerequisite))
+        self.prerequisites[task].remove(prerequisite)
+        self.dependents[prerequisite].remove(task)
+        self._task_graph = None
+        # The task can now be ready as soon as its other prerequisites
+        # are done, which is the first step that can change.
+        start_position = max((self._positions[other_prerequisite] + 1
+                              for other_prerequisite
+                              in self.prerequisites[task]), default=0)
+        self._reorder_from(start_position)
+        self._update_earliest_starts([task])
+
+    def _set_end_time(self, task):
+        end_time = self._earliest_starts[task] + self._durations[task]
+        heapq.heappush(self._end_times, (-end_time, task))
+        if len(self._end_times) > 2 * len(self._durations) + 16:
+            self._end_times = [
+                (-(self._earliest_starts[task] + self._durations[task]), task)
+                for task in self._durations]
+            heapq.heapify(self._end_times)
+
+    def _update_earliest_starts(self, changed_tasks):
+        """
+        Recomputes the earliest start times of the changed tasks from
+        their prerequisites, and of their dependents in turn, in order,
+        for as long as they change.
+        """
+        changed_tasks = set(changed_tasks)
+        tasks_to_update = [(self._positions[task], task)
+                           for task in changed_tasks]
+        heapq.heapify(tasks_to_update)
+        queued_tasks = set(changed_tasks)
+        while tasks_to_update:
+            _, task = heapq.heappop(tasks_to_update)
+            queued_tasks.remove(task)
+            earliest_start = max(
+                (self._earliest_starts[prerequisite] +
+                 self._durations[prerequisite]
+                 for prerequisite in self.prerequisites[task]), default=0)
+            if earliest_start == self._earliest_starts[task] and \
+                    task not in changed_tasks:
+                continue
+            self._earliest_starts[task] = earliest_start
+            self._set_end_time(task)
+            for dependent in self.dependents[task]:
+                if dependent not in queued_tasks:
+                    queued_tasks.add(dependent)
+                    heapq.heappush(tasks_to_update,
+                                   (self._positions[dependent], dependent))
+
+    def get_tasks_order(self):
+        """
+        Returns the order in which the tasks need to be executed, same
+        as get_task_graph_order().
+        """
+        return ''.join(self._order)
+
+    def get_earliest_start_times(self):
+        """
+        Returns a dict of format {task: est}, the earliest each task can
+        start with unlimited workers, same as in
+        get_task_graph_analysis().
+        """
+        return dict(self._earliest_starts)
+
+    def get_critical_path_time(self):
+        """
+        Returns the time taken with unlimited workers, the longest end
+        time of any task. The end times are kept in a max-heap, where
+        the entries made stale by later changes are dropped lazily.
+        """
+        while self._end_times:
+            negative_end_time, task = self._end_times[0]
+            if self._earliest_starts[task] + self._durations[task] == \
+                    -negative_end_time:
+                return -negative_end_time
+            heapq.heappop(self._end_times)
+        return 0
+
+    def get_task_graph(self):
+        """
+        Returns the current graph as a task graph, as returned by
+        get_task_graph(), for the functions that take one. It is only
+        rebuilt after the graph changes, and is shared between calls,
+        so it shouldn't be modified.
+        """
+        if self._task_graph is None:
+            self._task_graph = get_task_graph(self.instructions, self._order)
+        return self._task_graph
+
+    def get_time_of_completion(self, workers=None):
+        """
+        Returns the overall time taken by the given number of workers,
+        same as simulate_workers(), or the critical path time if workers
+        is None. Only the critical path time is incremental; with a
+        number of workers, the simulation is run over the whole graph
+        on every call, which takes O(V + E) time, and the task graph it
+        runs over is rebuilt, in O(V + E log E) time, after every
+        change.
+        """
+        if workers is None:
+            return self.get_critical_path_time()
+        return simulate_workers(self.get_task_graph(), self._durations,
+                                workers)
 
 def one(input_file_name='day_seven.txt'):
     instructions = get_instructions(input_file_name)
-    instructions_graph = get_instructions_graph(instructions)
-    tasks_order = get_tasks_order(instructions_graph)
+    task_graph = get_task_graph(instructions)
+    tasks_order = get_task_graph_order(task_graph)
     return tasks_order
 
 def two(input_file_name='day_seven.txt', workers=5, extra_time=60):
     instructions = get_instructions(input_file_name)
-    instructions_graph = get_instructions_graph(instructions)
-    task_times = get_task_times(instructions_graph, extra_time)
-    nx.set_node_attributes(instructions_graph, task_times, 'duration')
-    overall_time = get_time_of_completion(instructions_graph,
-                                            task_times, workers)
+    task_graph = get_task_graph(instructions)
+    task_times = get_task_times(task_graph, extra_time)
+    overall_time = simulate_workers(task_graph, task_times, workers)
     return overall_time
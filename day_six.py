@@ -1,57 +1,94 @@
 from math import sqrt
-import os
 
 import numpy as np
 
-from config import DATA_DIR
+from loader import load_input
 
-LARGE_DISTANCE = 100000
+MAX_BLOCK_CELLS = 2 ** 22
+QUERY_BLOCK_SIZE = 2 ** 12
 
-def _get_input_list(input_file_name):
-    input_data_file = os.path.join(DATA_DIR, input_file_name)
+def _parse_input_file(input_data_file):
     with open(input_data_file, 'r') as fp:
-        input_data = [tuple(line.strip().split(', ')) for line in fp]
+        input_data = [tuple(line.strip().split(', ')) for line in fp
+                      if line.strip()]
     input_data = [(int(x), int(y)) for (x, y) in input_data]
-    return np.array(input_data)
+    return np.array(input_data, dtype=np.int64).reshape(-1, 2)
+
+def _get_input_list(input_file_name):
+    return load_input(input_file_name, _parse_input_file, 'coordinates')
 
 def get_distance(x1, y1, x2, y2):
 	x_diff = abs(x1 - x2)
 	y_diff = abs(y1 - y2)
 	return x_diff + y_diff
 
-def get_area_map(coordinates):
+def _get_nearest_locations_block(coordinates, rows, columns,
+									locations_per_block):
 	"""
-	Returns a numpy array, with each cell having the closest location
-	to it recorded in it.
+	Returns a numpy array of shape (len(rows), len(columns)) with the id
+	of the nearest location recorded in each cell, and -1 in the cells
+	which are equally far from more than one location. The locations are
+	gone through locations_per_block at a time, keeping a running
+	minimum distance, nearest location and count of the locations at
+	that distance for each cell.
 	"""
+	min_distances = np.full((len(rows), len(columns)), np.iinfo(np.int64).max)
+	nearest_locations = np.zeros((len(rows), len(columns)), dtype=np.int64)
+	nearest_counts = np.zeros((len(rows), len(columns)), dtype=np.int64)
+	for location_start in range(0, len(coordinates), locations_per_block):
+		block_coordinates = coordinates[location_start: location_start +
+										locations_per_block]
+		distances = np.empty((len(rows), len(columns),
+								len(block_coordinates)), dtype=np.int64)
+		np.subtract(columns[None, :, None], block_coordinates[:, 1],
+					out=distances)
+		np.abs(distances, out=distances)
+		distances += np.abs(rows[:, None, None] - block_coordinates[:, 0])
+		block_min_distances = distances.min(axis=2)
+		block_nearest_counts = (distances ==
+								block_min_distances[:, :, None]).sum(axis=2)
+		is_closer = block_min_distances < min_distances
+		is_as_close = block_min_distances == min_distances
+		nearest_counts[is_as_close] += block_nearest_counts[is_as_close]
+		nearest_counts[is_closer] = block_nearest_counts[is_closer]
+		nearest_locations[is_closer] = distances.argmin(axis=2)[is_closer] + \
+										location_start
+		np.minimum(min_distances, block_min_distances, out=min_distances)
+	nearest_locations[nearest_counts > 1] = -1
+	return nearest_locations
 
-	def _get_nearest_location(row, column):
-		"""
-		"""
-		duplicate_found = False
-		min_distance = LARGE_DISTANCE
-		min_distance_location_id = -2
-		if [row, column] in coordinates.tolist():
-			return area_map[row][column]
-		for location_id, [x, y] in enumerate(coordinates):
-			distance = get_distance(x, y, row, column)
-			if distance < min_distance:
-				duplicate_found = False
-				min_distance = distance
-				min_distance_location_id = location_id
-			elif min_distance == distance:
-				duplicate_found = True
-		if duplicate_found:
-			min_distance_location_id = -1
-		return min_distance_location_id
+def get_area_map(coordinates):
+	"""
+	Returns a numpy array, with each cell having the closest location
+	to it recorded in it. Cells equally close to more than one location
+	are marked with a -1.
 
-	row_max, column_max = coordinates.max(axis = 0)
-	area_map = np.zeros((row_max + 1, column_max + 1))
-	for location_id, [row, column] in enumerate(coordinates):
-		area_map[row][column] = location_id
-	for row in range(row_max + 1):
-		for column in range(column_max + 1):
-			area_map[row][column] = _get_nearest_location(row, column)
+	The distances from the cells to every location are computed with
+	numpy broadcasting, a block of cells and of locations at a time, so
+	that no more than MAX_BLOCK_CELLS distances are held in memory at
+	once. Blocks span whole rows while they fit, and are split along
+	the columns, and then the locations, when even a single row
+	doesn't.
+	"""
+	row_max, column_max = coordinates.max(axis=0)
+	area_map = np.zeros((row_max + 1, column_max + 1), dtype=int)
+	locations_per_block = min(len(coordinates), MAX_BLOCK_CELLS)
+	columns_per_block = max(1, min(column_max + 1, MAX_BLOCK_CELLS //
+									locations_per_block))
+	rows_per_block = max(1, MAX_BLOCK_CELLS //
+							(columns_per_block * locations_per_block))
+	for row_start in range(0, row_max + 1, rows_per_block):
+		rows = np.arange(row_start, min(row_start + rows_per_block,
+										row_max + 1))
+		for column_start in range(0, column_max + 1, columns_per_block):
+			columns = np.arange(column_start,
+								min(column_start + columns_per_block,
+									column_max + 1))
+			area_map[rows[0]: rows[-1] + 1, columns[0]: columns[-1] + 1] = \
+				_get_nearest_locations_block(coordinates, rows, columns,
+												locations_per_block)
+	location_ids = np.arange(len(coordinates))
+	area_map[coordinates[:, 0], coordinates[:, 1]] = location_ids
 	return area_map
 
 def get_unbounded_locations(area_map, coordinates):
@@ -71,33 +108,505 @@ def get_bounded_area_dict(area_map, coordinates, unbounded_locations):
 	Returns a dict with the relevant locations and their respective
 	areas as keys and values.
 	"""
+	areas = np.bincount(area_map[area_map >= 0].astype(int),
+						minlength=len(coordinates))
 	bounded_area_dict = {}
 	for location_id, [x, y] in enumerate(coordinates):
 		if location_id in unbounded_locations:
 			continue
-		bounded_area_dict[location_id] = (area_map == location_id).sum()
+		bounded_area_dict[location_id] = areas[location_id]
 	return bounded_area_dict
 
+def _get_rotated_points(points):
+	"""
+	Rotates points by 45 degrees, to (row + column, row - column), which
+	turns the Manhattan distance between them into the Chebyshev
+	distance, the larger of the differences along the two axes.
+	"""
+	points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+	return np.stack((points[:, 0] + points[:, 1],
+						points[:, 0] - points[:, 1]), axis=1)
+
+class NearestLocationIndex:
+	"""
+	A spatial index over the locations, for finding the location
+	nearest to any cell, inside or outside the bounding box of the
+	locations, without building the area map.
+
+	The locations are rotated by 45 degrees, so that the Manhattan
+	distance becomes the Chebyshev distance, and put into a grid of
+	square buckets of bucket_size cells. A query looks at the buckets in
+	a growing square around its own bucket, until no location outside
+	the square can be as near as the nearest one found. The queries are
+	answered in batches, with numpy.
+
+	Usage -
+		location_index = NearestLocationIndex(_get_input_list('day_six.txt'))
+		location_index.get_nearest_locations([(0, 0), (1000, -20)])
+		location_index.get_nearest_location_ids(0, 0)
+	"""
+	def __init__(self, coordinates, bucket_size=None):
+		self.coordinates = np.asarray(coordinates,
+										dtype=np.int64).reshape(-1, 2)
+		if not len(self.coordinates):
+			raise ValueError('No locations to index')
+		self._rotated_coordinates = _get_rotated_points(self.coordinates)
+		self._origin = self._rotated_coordinates.min(axis=0)
+		extents = self._rotated_coordinates.max(axis=0) - self._origin + 1
+		if bucket_size is None:
+			cells_per_location = extents.prod() / len(self.coordinates)
+			bucket_size = max(1, int(np.ceil(np.sqrt(2 * cells_per_location))))
+		self.bucket_size = bucket_size
+		bucket_keys = (self._rotated_coordinates - self._origin) // bucket_size
+		self._bucket_shape = tuple(int(size)
+									for size in bucket_keys.max(axis=0) + 1)
+		flat_keys = np.ravel_multi_index(tuple(bucket_keys.T),
+											self._bucket_shape)
+		# The location ids are sorted by bucket, with the ids in bucket b
+		# being _location_ids[_bucket_offsets[b]: _bucket_offsets[b + 1]].
+		self._location_ids = np.argsort(flat_keys, kind='stable')
+		bucket_counts = np.bincount(flat_keys,
+									minlength=np.prod(self._bucket_shape))
+		self._bucket_offsets = np.concatenate(([0], np.cumsum(bucket_counts)))
+		self._summed_counts = np.zeros((self._bucket_shape[0] + 1,
+										self._bucket_shape[1] + 1),
+										dtype=np.int64)
+		self._summed_counts[1:, 1:] = bucket_counts.reshape(
+			self._bucket_shape).cumsum(axis=0).cumsum(axis=1)
+
+	def _get_squares(self, bucket_keys, radius):
+		"""
+		Returns the first and last bucket keys of the squares of buckets
+		of the given radius around each of the bucket keys, cut down to
+		the grid, along with whether each square is better off replaced
+		by a scan of all the locations, and the number of candidates.
+		"""
+		square_min = np.maximum(bucket_keys - radius, 0)
+		square_max = np.minimum(bucket_keys + radius,
+								np.array(self._bucket_shape) - 1)
+		summed_counts = self._summed_counts
+		counts = summed_counts[square_max[:, 0] + 1, square_max[:, 1] + 1] - \
+					summed_counts[square_min[:, 0], square_max[:, 1] + 1] - \
+					summed_counts[square_max[:, 0] + 1, square_min[:, 1]] + \
+					summed_counts[square_min[:, 0], square_min[:, 1]]
+		buckets = (square_max - square_min + 1).prod(axis=1)
+		scan_all = buckets + counts >= len(self.coordinates)
+		counts[scan_all] = len(self.coordinates)
+		return square_min, square_max, scan_all, counts
+
+	def _get_candidates(self, square_min, square_max):
+		"""
+		Returns the ids of the locations in each of the squares of
+		buckets as one flat array, along with the index of the square
+		each candidate is for. Each row of buckets in a square is a
+		single run of the sorted location ids, so the candidates are
+		gathered a run at a time.
+		"""
+		rows_per_square = square_max[:, 0] - square_min[:, 0] + 1
+		row_square_ixs = np.repeat(np.arange(len(square_min)), rows_per_square)
+		rows = square_min[row_square_ixs, 0] + \
+				np.arange(len(row_square_ixs)) - \
+				np.repeat(np.cumsum(rows_per_square) - rows_per_square,
+							rows_per_square)
+		columns = self._bucket_shape[1]
+		run_starts = self._bucket_offsets[
+			rows * columns + square_min[row_square_ixs, 1]]
+		run_stops = self._bucket_offsets[
+			rows * columns + square_max[row_square_ixs, 1] + 1]
+		run_lengths = run_stops - run_starts
+		run_offsets = run_starts - np.cumsum(run_lengths) + run_lengths
+		positions = np.arange(run_lengths.sum()) + \
+					np.repeat(run_offsets, run_lengths)
+		return self._location_ids[positions], \
+			np.repeat(row_square_ixs, run_lengths)
+
+	def _get_outside_distances(self, rotated_points, bucket_keys, radius):
+		"""
+		Returns, for each point, a lower bound on the distance to the
+		locations outside the square of buckets of the given radius
+		around its bucket.
+		"""
+		square_min = bucket_keys - radius
+		square_max = bucket_keys + radius
+		lower_gaps = rotated_points - (self._origin +
+										square_min * self.bucket_size) + 1
+		upper_gaps = self._origin + (square_max + 1) * self.bucket_size - \
+						rotated_points
+		no_bound = np.iinfo(np.int64).max
+		lower_gaps = np.where(square_min > 0, lower_gaps, no_bound)
+		upper_gaps = np.where(square_max < np.array(self._bucket_shape) - 1,
+								upper_gaps, no_bound)
+		return np.minimum(lower_gaps, upper_gaps).min(axis=1)
+
+	def _get_candidate_distances(self, rotated_points, candidates, point_ixs):
+		return np.maximum(
+			np.abs(self._rotated_coordinates[candidates, 0] -
+					rotated_points[point_ixs, 0]),
+			np.abs(self._rotated_coordinates[candidates, 1] -
+					rotated_points[point_ixs, 1]))
+
+	def _scan_locations(self, rotated_points):
+		"""
+		Returns the nearest location (-1 on a tie) of each of the points
+		and its distance, from the distances to all the locations.
+		"""
+		rows, columns = self._rotated_coordinates.T
+		distances = np.maximum(np.abs(rows - rotated_points[:, None, 0]),
+								np.abs(columns - rotated_points[:, None, 1]))
+		min_distances = distances.min(axis=1)
+		is_nearest = distances == min_distances[:, None]
+		nearest_locations = np.where(is_nearest.sum(axis=1) == 1,
+										is_nearest.argmax(axis=1), -1)
+		return nearest_locations, min_distances
+
+	def _find_nearest_locations(self, rotated_points, bucket_keys, radius):
+		"""
+		Looks for the nearest locations of the points in the square of
+		buckets of the given radius around their buckets, or among all
+		the locations when that's cheaper. Returns whether each point's
+		nearest location is sure to have been found, along with the
+		nearest location (-1 on a tie) and its distance.
+		"""
+		square_min, square_max, scan_all, _ = self._get_squares(bucket_keys,
+																radius)
+		nearest_locations = np.full(len(rotated_points), -1, dtype=np.int64)
+		min_distances = np.full(len(rotated_points), np.iinfo(np.int64).max)
+		if scan_all.any():
+			nearest_locations[scan_all], min_distances[scan_all] = \
+				self._scan_locations(rotated_points[scan_all])
+		searched_ixs = np.flatnonzero(~scan_all)
+		candidates, point_ixs = self._get_candidates(
+			square_min[searched_ixs], square_max[searched_ixs])
+		point_ixs = searched_ixs[point_ixs]
+		distances = self._get_candidate_distances(rotated_points, candidates,
+													point_ixs)
+		candidate_counts = np.bincount(point_ixs,
+										minlength=len(rotated_points))
+		has_candidates = candidate_counts > 0
+		group_starts = np.cumsum(candidate_counts) - candidate_counts
+		if len(candidates):
+			min_distances[has_candidates] = np.minimum.reduceat(
+				distances, group_starts[has_candidates])
+		is_nearest = distances == min_distances[point_ixs]
+		nearest_counts = np.bincount(point_ixs[is_nearest],
+										minlength=len(rotated_points))
+		nearest_locations[point_ixs[is_nearest]] = candidates[is_nearest]
+		nearest_locations[~scan_all & (nearest_counts != 1)] = -1
+		found = scan_all | (min_distances < self._get_outside_distances(
+			rotated_points, bucket_keys, radius))
+		return found, nearest_locations, min_distances
+
+	def _get_bucket_keys(self, rotated_points):
+		return np.clip((rotated_points - self._origin) // self.bucket_size,
+						0, np.array(self._bucket_shape) - 1)
+
+	def get_nearest_locations(self, points, return_distances=False):
+		"""
+		Returns the id of the nearest location to each of the points,
+		by Manhattan distance, with -1 for the points which are equally
+		far from more than one location, same as in get_area_map().
+
+		The points are searched for in rounds, with the square of
+		buckets doubling in size every round for the points whose
+		nearest location hasn't been found yet. Points far outside the
+		bounding box of the locations take the most rounds, until their
+		square would cost more than a scan of all the locations, which
+		is then done instead. The points are searched for up to
+		QUERY_BLOCK_SIZE at a time, with no more than about
+		MAX_BLOCK_CELLS candidates held in memory at once.
+
+		Inputs -
+			points - an array-like of (row, column) pairs, which can lie
+				anywhere, including outside the bounding box of the
+				locations.
+			return_distances - bool, whether to also return the
+				distance to the nearest location of each point.
+
+		Returns -
+			nearest_locations - a numpy array of location ids.
+			nearest_distances - a numpy array of distances, only when
+				return_distances is True.
+		"""
+		rotated_points = _get_rotated_points(points)
+		nearest_locations = np.full(len(rotated_points), -1, dtype=np.int64)
+		nearest_distances = np.zeros(len(rotated_points), dtype=np.int64)
+		bucket_keys = self._get_bucket_keys(rotated_points)
+		pending = np.arange(len(rotated_points))
+		radius = 0
+		while len(pending):
+			*_, candidate_counts = self._get_squares(bucket_keys[pending],
+														radius)
+			total_counts = np.cumsum(candidate_counts)
+			found = np.zeros(len(pending), dtype=bool)
+			block_start = 0
+			while block_start < len(pending):
+				block_limit = MAX_BLOCK_CELLS + \
+					(total_counts[block_start - 1] if block_start else 0)
+				block_stop = np.searchsorted(total_counts, block_limit,
+												side='right')
+				block_stop = min(max(block_stop, block_start + 1),
+									block_start + QUERY_BLOCK_SIZE)
+				block = slice(block_start, block_stop)
+				block_ids = pending[block]
+				found[block], block_locations, block_distances = \
+					self._find_nearest_locations(rotated_points[block_ids],
+													bucket_keys[block_ids],
+													radius)
+				nearest_locations[block_ids] = block_locations
+				nearest_distances[block_ids] = block_distances
+				block_start = block_stop
+			pending = pending[~found]
+			radius = 2 * radius + 1
+		if return_distances:
+			return nearest_locations, nearest_distances
+		return nearest_locations
+
+	def get_nearest_location_ids(self, row, column):
+		"""
+		Returns the ids of all the locations nearest to the cell at
+		(row, column), in ascending order. There is more than one id
+		when the cell is tied between several locations.
+		"""
+		_, (nearest_distance,) = self.get_nearest_locations(
+			[(row, column)], return_distances=True)
+		rotated_point = _get_rotated_points([(row, column)])
+		radius = nearest_distance // self.bucket_size + 1
+		square_min, square_max, (scan_all,), _ = self._get_squares(
+			self._get_bucket_keys(rotated_point), radius)
+		if scan_all:
+			candidates = np.arange(len(self.coordinates))
+			point_ixs = np.zeros_like(candidates)
+		else:
+			candidates, point_ixs = self._get_candidates(square_min,
+															square_max)
+		distances = self._get_candidate_distances(rotated_point, candidates,
+													point_ixs)
+		return sorted(candidates[distances == nearest_distance].tolist())
+
+def _get_running_minimums(indices, keys, span):
+	"""
+	For each index in range(span), finds the minimum of the keys at or
+	before it, along with the number of keys equal to that minimum, and
+	the position of one of them in keys.
+	"""
+	no_key = np.iinfo(np.int64).max // 4
+	min_keys = np.full(span, no_key, dtype=np.int64)
+	np.minimum.at(min_keys, indices, keys)
+	is_min = keys == min_keys[indices]
+	counts = np.bincount(indices[is_min], minlength=span)
+	owners = np.full(span, -1, dtype=np.int64)
+	owners[indices[is_min]] = np.nonzero(is_min)[0]
+	running_keys = np.minimum.accumulate(min_keys)
+	contributions = np.where(min_keys == running_keys, counts, 0)
+	span_ixs = np.arange(span)
+	is_new_minimum = np.concatenate(([True],
+										running_keys[1:] < running_keys[:-1]))
+	group_starts = np.maximum.accumulate(np.where(is_new_minimum, span_ixs, 0))
+	total_contributions = np.cumsum(contributions)
+	running_counts = total_contributions - \
+						total_contributions[group_starts] + \
+						contributions[group_starts]
+	last_contributions = np.maximum.accumulate(
+		np.where(contributions > 0, span_ixs, -1))
+	running_owners = np.where(last_contributions >= 0,
+								owners[np.maximum(last_contributions, 0)], -1)
+	return running_keys, running_counts, running_owners
+
+def _get_envelope_owners(positions, offsets):
+	"""
+	Returns the locations which are, for some integer y, the only
+	minimum of abs(y - position) - offset, from the lower envelope of
+	those V shaped functions. It is computed with running minimums from
+	the left and from the right, for every y between the smallest and
+	largest position; beyond them the minimum doesn't change.
+	"""
+	lower, upper = positions.min(), positions.max()
+	span = upper - lower + 1
+	ys = np.arange(lower, upper + 1)
+	left_keys, left_counts, left_owners = _get_running_minimums(
+		positions - lower, -positions - offsets, span)
+	right_keys, right_counts, right_owners = _get_running_minimums(
+		upper - positions, positions - offsets, span)
+	right_keys = np.append(right_keys[::-1][1:], np.iinfo(np.int64).max // 4)
+	right_counts = np.append(right_counts[::-1][1:], 0)
+	right_owners = np.append(right_owners[::-1][1:], -1)
+	left_values = ys + left_keys
+	right_values = right_keys - ys
+	min_values = np.minimum(left_values, right_values)
+	counts = np.where(left_values == min_values, left_counts, 0) + \
+				np.where(right_values == min_values, right_counts, 0)
+	owners = np.where(left_values == min_values, left_owners, right_owners)
+	return np.unique(owners[counts == 1])
+
+def get_unbounded_locations_by_envelope(coordinates):
+	"""
+	Returns the locations whose areas are infinite, from the coordinates
+	alone, without building the area map.
+
+	Far enough past the largest row, at rows >= row_max, the distance
+	from a cell (row, column) to a location is row - location_row +
+	abs(column - location_column), so which location is nearest depends
+	only on the column, and stays the same all the way to infinity.
+	A location's area is therefore infinite in that direction if and
+	only if it is the only minimum of abs(column - location_column) -
+	location_row for some column, and likewise for the other three
+	directions. Each of these is a lower envelope over the columns (or
+	rows) spanned by the locations, which takes O(N + W + H) time for
+	N locations spanning W rows and H columns, instead of the O(N W H)
+	of the area map.
+	"""
+	rows, columns = coordinates[:, 0], coordinates[:, 1]
+	unbounded_locations = set()
+	for positions, offsets in ((columns, rows), (columns, -rows),
+								(rows, columns), (rows, -columns)):
+		unbounded_locations.update(
+			_get_envelope_owners(positions, offsets).tolist())
+	return sorted(unbounded_locations)
+
+def get_bounded_areas_by_search(coordinates, unbounded_locations,
+								location_index=None):
+	"""
+	Returns a dict with the bounded locations and their respective
+	areas as keys and values, same as get_bounded_area_dict(), without
+	building the area map.
+
+	The areas are found with a breadth first search from all of the
+	bounded locations at once, which only steps into the cells that are
+	nearest to a bounded location, as found by a NearestLocationIndex.
+	Every cell on a shortest path from a location to a cell nearest to
+	it is also nearest to that location, so each area is reached in
+	full, and the search takes time in proportion to the bounded areas
+	and their borders. Each step of the search is a single batch of
+	queries to the index.
+	"""
+	if location_index is None:
+		location_index = NearestLocationIndex(coordinates)
+	is_bounded = np.ones(len(coordinates), dtype=bool)
+	is_bounded[list(unbounded_locations)] = False
+	row_min, column_min = coordinates.min(axis=0) - 1
+	width = coordinates[:, 1].max() - column_min + 2
+	steps = np.array([-width, width, -1, 1])
+
+	def _get_cells(cell_keys):
+		return np.stack((cell_keys // width + row_min,
+							cell_keys % width + column_min), axis=1)
+
+	bounded_ids = np.nonzero(is_bounded)[0]
+	cell_keys = (coordinates[bounded_ids, 0] - row_min) * width + \
+				coordinates[bounded_ids, 1] - column_min
+	owners = location_index.get_nearest_locations(_get_cells(cell_keys))
+	is_reached = owners == bounded_ids
+	cell_keys = np.sort(cell_keys[is_reached])
+	areas = np.bincount(owners[is_reached], minlength=len(coordinates))
+	previous_cell_keys = np.array([], dtype=np.int64)
+	while len(cell_keys):
+		neighbour_keys = np.unique((cell_keys[:, None] + steps).ravel())
+		neighbour_keys = np.setdiff1d(neighbour_keys, cell_keys,
+										assume_unique=True)
+		neighbour_keys = np.setdiff1d(neighbour_keys, previous_cell_keys,
+										assume_unique=True)
+		owners = location_index.get_nearest_locations(
+			_get_cells(neighbour_keys))
+		is_reached = owners >= 0
+		is_reached[is_reached] = is_bounded[owners[is_reached]]
+		areas += np.bincount(owners[is_reached], minlength=len(coordinates))
+		previous_cell_keys, cell_keys = cell_keys, neighbour_keys[is_reached]
+	return {location_id: int(areas[location_id])
+			for location_id in bounded_ids}
+
+def _get_distance_profile(values, lower, upper):
+	"""
+	Returns a numpy array with the sum of distances from every point in
+	[lower, upper] to all of the values, along a single axis.
+
+	The values are sorted once, so that the sum for each point can be
+	read off the prefix sums of the values on either side of it.
+	"""
+	sorted_values = np.sort(values).astype(np.int64)
+	prefix_sums = np.concatenate(([0], np.cumsum(sorted_values)))
+	points = np.arange(lower, upper + 1, dtype=np.int64)
+	left_counts = np.searchsorted(sorted_values, points, side='right')
+	right_counts = len(sorted_values) - left_counts
+	left_sums = prefix_sums[left_counts]
+	right_sums = prefix_sums[-1] - left_sums
+	return points * left_counts - left_sums + \
+			right_sums - points * right_counts
+
+def _get_region_bounds(coordinates, max_distance):
+	"""
+	Returns the (row_min, row_max, column_min, column_max) bounds which
+	contain every cell with a total distance below max_distance. Every
+	step outside the bounding box of the locations adds len(coordinates)
+	to the total distance, so the region can't extend any further than
+	max_distance // len(coordinates) past the bounding box.
+	"""
+	padding = max(max_distance, 0) // len(coordinates) + 1
+	row_min, column_min = coordinates.min(axis=0) - padding
+	row_max, column_max = coordinates.max(axis=0) + padding
+	return row_min, row_max, column_min, column_max
+
 def get_connected_area(coordinates, max_distance):
 	"""
 	Returns a numpy array with all cells in it that has the sum of
-	distances to all the locations below max_distance.
+	distances to all the locations below max_distance. The array only
+	covers the cells from (0, 0) to the maximum coordinates; use
+	get_connected_region() for the whole region.
 	"""
-	def is_connected(row, column):
-		total_distance = 0
-		for location_id, [x, y] in enumerate(coordinates):
-			total_distance += get_distance(x, y, row, column)
-		return total_distance < max_distance
-
 	row_max, column_max = coordinates.max(axis = 0)
-	connected_area = np.zeros((row_max + 1, column_max + 1))
-	for row in range(row_max + 1):
-		for column in range(column_max + 1):
-			connected_area[row][column] = is_connected(row, column)
+	row_distances = _get_distance_profile(coordinates[:, 0], 0, row_max)
+	column_distances = _get_distance_profile(coordinates[:, 1], 0,
+												column_max)
+	total_distances = row_distances[:, None] + column_distances[None, :]
+	connected_area = total_distances < max_distance
 	return connected_area
 
-def one(input_file_name='day_six.txt'):
+def get_connected_region(coordinates, max_distance):
+	"""
+	Returns a numpy array with all cells in it that has the sum of
+	distances to all the locations below max_distance, along with the
+	(row, column) of the cell at its origin. Unlike
+	get_connected_area(), the array covers the whole region, even
+	where it extends beyond the bounding box of the locations.
+	"""
+	row_min, row_max, column_min, column_max = _get_region_bounds(
+		coordinates, max_distance)
+	row_distances = _get_distance_profile(coordinates[:, 0], row_min,
+											row_max)
+	column_distances = _get_distance_profile(coordinates[:, 1],
+												column_min, column_max)
+	total_distances = row_distances[:, None] + column_distances[None, :]
+	connected_region = total_distances < max_distance
+	return connected_region, (row_min, column_min)
+
+def get_connected_area_size(coordinates, max_distance):
+	"""
+	Returns the number of cells that has the sum of distances to all
+	the locations below max_distance, without building the region.
+
+	For each row, the number of columns close enough to it is looked up
+	in the sorted column distances, so this takes O((W + H) log H) time
+	for a region of W rows and H columns.
+	"""
+	row_min, row_max, column_min, column_max = _get_region_bounds(
+		coordinates, max_distance)
+	row_distances = _get_distance_profile(coordinates[:, 0], row_min,
+											row_max)
+	column_distances = _get_distance_profile(coordinates[:, 1],
+												column_min, column_max)
+	column_distances.sort()
+	column_counts = np.searchsorted(column_distances,
+									max_distance - row_distances,
+									side='left')
+	return int(column_counts.sum())
+
+def one(input_file_name='day_six.txt', grid_free=False):
 	coordinates = _get_input_list(input_file_name)
+	if grid_free:
+		unbounded_locations = get_unbounded_locations_by_envelope(
+			coordinates)
+		bounded_area_dict = get_bounded_areas_by_search(coordinates,
+														unbounded_locations)
+		return max(bounded_area_dict.values())
 	area_map = get_area_map(coordinates)
 	unbounded_locations = get_unbounded_locations(area_map, coordinates)
 	bounded_area_dict = get_bounded_area_dict(area_map, coordinates,
@@ -106,5 +615,4 @@ def one(input_file_name='day_six.txt'):
 
 def two(input_file_name='day_six.txt'):
 	coordinates = _get_input_list(input_file_name)
-	connected_area = get_connected_area(coordinates, 10000)
-	return connected_area.sum()
+	return get_connected_area_size(coordinates, 10000)
@@ -1,9 +1,11 @@
-import os
 import re
 
 import numpy as np
 
-from config import DATA_DIR
+from loader import load_input
+
+MAX_DENSE_CELLS = 10 ** 8
+MAX_CLAIM_BUCKETS = 256
 
 def _parse_claim(input_line):
 	"""
@@ -26,10 +28,21 @@ def _parse_claim(input_line):
 						for ix, _ in enumerate(claim_details)])
 	return claim_dict
 
-def _get_input_list(input_file_name):
-	input_data_file = os.path.join(DATA_DIR, input_file_name)
+def _parse_input_file(input_data_file):
+	"""
+	Parses all the claims in a file into an np.array of shape (number
+	of claims, 5), with the columns being ['id', 'x', 'y', 'w', 'h'].
+	"""
 	with open(input_data_file, 'r') as fp:
-		input_data = [_parse_claim(line.strip()) for line in fp]
+		claims = [_parse_claim(line.strip()) for line in fp if line.strip()]
+	claim_keys = ['id', 'x', 'y', 'w', 'h']
+	return np.array([[claim[key] for key in claim_keys] for claim in claims],
+					dtype=np.int64).reshape(-1, len(claim_keys))
+
+def _get_input_list(input_file_name):
+	claim_keys = ['id', 'x', 'y', 'w', 'h']
+	claims = load_input(input_file_name, _parse_input_file, 'claims')
+	input_data = [dict(zip(claim_keys, claim)) for claim in claims.tolist()]
 	return input_data
 
 def _get_fabric_with_claims(claims):
@@ -53,17 +66,364 @@ def _get_fabric_with_claims(claims):
 		patch[patch == 0] = claim['id']
 	return fabric
 
-def one():
+def _get_count_dtype(max_count):
+	"""
+	Returns the smallest signed integer dtype that can hold counts
+	between -max_count and max_count.
+	"""
+	return np.promote_types(np.min_scalar_type(-max_count - 1), np.int16)
+
+def _get_fabric_bounds(claims):
+	"""
+	Returns the (x_min, y_min, x_max, y_max) bounds of the fabric that
+	is covered by the claims, with the max bounds being exclusive, or
+	all zeros if there are no claims.
+	"""
+	if not claims:
+		return 0, 0, 0, 0
+	x_min = min(claim['x'] for claim in claims)
+	y_min = min(claim['y'] for claim in claims)
+	x_max = max(claim['x'] + claim['w'] for claim in claims)
+	y_max = max(claim['y'] + claim['h'] for claim in claims)
+	return x_min, y_min, x_max, y_max
+
+def get_coverage_counts(claims):
+	"""
+	Returns the number of claims covering each square inch of the
+	fabric. The counts are built from a 2-D difference array, where
+	each claim only marks its four corners, followed by a cumulative
+	sum along both the axes.
+
+	Inputs -
+		claims - a list of dicts, each dict representing a claim. Same
+			dict as returned by _parse_claim().
+
+	Returns -
+		coverage_counts - an np.array with the number of claims in each
+			square inch, covering only the bounds of the claims.
+		origin - (x_min, y_min), the square inch of the fabric at
+			coverage_counts[0, 0].
+	"""
+	x_min, y_min, x_max, y_max = _get_fabric_bounds(claims)
+	count_dtype = _get_count_dtype(len(claims))
+	differences = np.zeros((x_max - x_min + 1, y_max - y_min + 1),
+							dtype=count_dtype)
+	x_starts = np.array([claim['x'] for claim in claims],
+						dtype=np.int64) - x_min
+	y_starts = np.array([claim['y'] for claim in claims],
+						dtype=np.int64) - y_min
+	x_ends = x_starts + np.array([claim['w'] for claim in claims],
+									dtype=np.int64)
+	y_ends = y_starts + np.array([claim['h'] for claim in claims],
+									dtype=np.int64)
+	np.add.at(differences, (x_starts, y_starts), 1)
+	np.add.at(differences, (x_starts, y_ends), -1)
+	np.add.at(differences, (x_ends, y_starts), -1)
+	np.add.at(differences, (x_ends, y_ends), 1)
+	coverage_counts = differences.cumsum(axis=0, dtype=count_dtype)
+	coverage_counts.cumsum(axis=1, dtype=count_dtype, out=coverage_counts)
+	return coverage_counts[:-1, :-1], (x_min, y_min)
+
+def _get_intact_claim_ids(claims, coverage_counts, origin):
+	"""
+	Returns the ids of the claims that don't overlap with any other
+	claim. The overlapping square inches are summed up into a summed
+	area table, so that the overlaps within each claim can be read off
+	its four corners.
+	"""
+	x_min, y_min = origin
+	overlaps = (coverage_counts > 1)
+	overlap_dtype = _get_count_dtype(overlaps.size)
+	summed_overlaps = np.zeros((overlaps.shape[0] + 1,
+								overlaps.shape[1] + 1), dtype=overlap_dtype)
+	overlaps.cumsum(axis=0, dtype=overlap_dtype, out=summed_overlaps[1:, 1:])
+	summed_overlaps.cumsum(axis=1, dtype=overlap_dtype, out=summed_overlaps)
+	x_starts = np.array([claim['x'] for claim in claims],
+						dtype=np.int64) - x_min
+	y_starts = np.array([claim['y'] for claim in claims],
+						dtype=np.int64) - y_min
+	x_ends = x_starts + np.array([claim['w'] for claim in claims],
+									dtype=np.int64)
+	y_ends = y_starts + np.array([claim['h'] for claim in claims],
+									dtype=np.int64)
+	overlapping_square_inches = summed_overlaps[x_ends, y_ends] - \
+								summed_overlaps[x_starts, y_ends] - \
+								summed_overlaps[x_ends, y_starts] + \
+								summed_overlaps[x_starts, y_starts]
+	return [claim['id'] for claim, overlapping in
+				zip(claims, overlapping_square_inches) if not overlapping]
+
+def _get_overlapping_area_by_sweep(claims):
+	"""
+	Returns the number of square inches covered by two or more claims,
+	without allocating the fabric. A vertical line is swept across the
+	claims' left and right edges, and a segment tree over the distinct
+	y coordinates keeps track of the length of the line that is covered
+	at least once and at least twice.
+	"""
+	ys = sorted({claim['y'] for claim in claims} |
+				{claim['y'] + claim['h'] for claim in claims})
+	y_index = {y: ix for ix, y in enumerate(ys)}
+	segments = len(ys) - 1
+	if segments < 1:
+		return 0
+	counts = [0] * (4 * segments)
+	covered_once = [0] * (4 * segments)
+	covered_twice = [0] * (4 * segments)
+
+	def _update(node, lo, hi, start, end, delta):
+		if end <= lo or hi <= start:
+			return
+		if start <= lo and hi <= end:
+			counts[node] += delta
+		else:
+			mid = (lo + hi) // 2
+			_update(2 * node, lo, mid, start, end, delta)
+			_update(2 * node + 1, mid, hi, start, end, delta)
+		length = ys[hi] - ys[lo]
+		is_leaf = hi - lo == 1
+		if counts[node] >= 2:
+			covered_once[node] = covered_twice[node] = length
+		elif counts[node] == 1:
+			covered_once[node] = length
+			covered_twice[node] = 0 if is_leaf else \
+				covered_once[2 * node] + covered_once[2 * node + 1]
+		elif is_leaf:
+			covered_once[node] = covered_twice[node] = 0
+		else:
+			covered_once[node] = covered_once[2 * node] + \
+									covered_once[2 * node + 1]
+			covered_twice[node] = covered_twice[2 * node] + \
+									covered_twice[2 * node + 1]
+
+	events = []
+	for claim in claims:
+		start, end = y_index[claim['y']], y_index[claim['y'] + claim['h']]
+		events.append((claim['x'], 1, start, end))
+		events.append((claim['x'] + claim['w'], -1, start, end))
+	events.sort()
+	overlapping_area = 0
+	previous_x = events[0][0] if events else 0
+	for x, delta, start, end in events:
+		overlapping_area += covered_twice[1] * (x - previous_x)
+		previous_x = x
+		if start < end:
+			_update(1, 0, segments, start, end, delta)
+	return overlapping_area
+
+def get_overlapping_claim_pairs(claims):
+	"""
+	Yields every pair of claims that share at least one square inch. The
+	claims are swept from left to right, and each claim is only compared
+	with the claims whose x ranges are still open when it starts.
+
+	Inputs -
+		claims - an iterable of dicts, each dict representing a claim.
+			Same dict as returned by _parse_claim().
+
+	Returns -
+		overlapping_pairs - an iterator of (claim, other_claim) tuples,
+			with claim starting at or to the left of other_claim.
+	"""
+	active_claims = []
+	for claim in sorted(claims, key=lambda claim: claim['x']):
+		if not (claim['w'] and claim['h']):
+			continue
+		active_claims = [active_claim for active_claim in active_claims
+							if active_claim['x'] + active_claim['w'] >
+								claim['x']]
+		for active_claim in active_claims:
+			if active_claim['y'] < claim['y'] + claim['h'] and \
+					claim['y'] < active_claim['y'] + active_claim['h']:
+				yield active_claim, claim
+		active_claims.append(claim)
+
+def _get_intact_claim_ids_by_sweep(claims):
+	"""
+	Returns the ids of the claims that don't overlap with any other
+	claim, without allocating the fabric.
+	"""
+	overlapping_ids = set()
+	for claim, other_claim in get_overlapping_claim_pairs(claims):
+		overlapping_ids.add(claim['id'])
+		overlapping_ids.add(other_claim['id'])
+	return [claim['id'] for claim in claims
+				if claim['id'] not in overlapping_ids]
+
+class ClaimIndex:
+	"""
+	A spatial index over claims, for finding the claims at a square
+	inch or within a rectangle without going through all the claims.
+	The fabric is divided into square buckets of bucket_size inches,
+	and each claim is listed in every bucket it covers, so a query only
+	looks at the claims in the buckets it touches. Claims covering more
+	than MAX_CLAIM_BUCKETS buckets are instead kept in a list which
+	every query checks, and queries touching more buckets than are
+	occupied go through the occupied buckets, so neither large claims
+	nor large queries cost in proportion to their area. Claims can be
+	added at any time.
+
+	Usage -
+		claim_index = ClaimIndex(_get_input_list('day_three.txt'))
+		claim_index.get_claims_at(400, 523)
+		claim_index.get_conflicting_claim_ids(claim_index.claims[1305])
+	"""
+	def __init__(self, claims=(), bucket_size=32):
+		self.bucket_size = bucket_size
+		self.claims = {}
+		self._buckets = {}
+		self._large_claims = []
+		self._claim_orders = {}
+		self.add_claims(claims)
+
+	def _get_bucket_ranges(self, x, y, w, h):
+		x_buckets = range(x // self.bucket_size,
+							(x + w - 1) // self.bucket_size + 1)
+		y_buckets = range(y // self.bucket_size,
+							(y + h - 1) // self.bucket_size + 1)
+		return x_buckets, y_buckets
+
+	def _get_occupied_bucket_keys(self, x, y, w, h):
+		"""
+		Returns the keys of the occupied buckets that the w x h
+		rectangle at (x, y) touches, going through whichever of those
+		buckets or of the occupied buckets are fewer.
+		"""
+		x_buckets, y_buckets = self._get_bucket_ranges(x, y, w, h)
+		if len(x_buckets) * len(y_buckets) > len(self._buckets):
+			return [bucket_key for bucket_key in self._buckets
+						if bucket_key[0] in x_buckets and
+							bucket_key[1] in y_buckets]
+		return [(x_bucket, y_bucket)
+					for x_bucket in x_buckets for y_bucket in y_buckets
+					if (x_bucket, y_bucket) in self._buckets]
+
+	def add_claim(self, claim):
+		"""
+		Adds a claim dict, same as returned by _parse_claim(), to the
+		index. Claim ids are expected to be unique. Claims covering no
+		square inches are kept in claims, but are never found by the
+		queries.
+		"""
+		self.claims[claim['id']] = claim
+		self._claim_orders[claim['id']] = len(self._claim_orders)
+		if not (claim['w'] and claim['h']):
+			return
+		x_buckets, y_buckets = self._get_bucket_ranges(
+			claim['x'], claim['y'], claim['w'], claim['h'])
+		if len(x_buckets) * len(y_buckets) > MAX_CLAIM_BUCKETS:
+			self._large_claims.append(claim)
+			return
+		for x_bucket in x_buckets:
+			for y_bucket in y_buckets:
+				self._buckets.setdefault((x_bucket, y_bucket),
+											[]).append(claim)
+
+	def add_claims(self, claims):
+		for claim in claims:
+			self.add_claim(claim)
+
+	def get_claims_at(self, x, y):
+		"""
+		Returns the claims covering the square inch at (x, y), in the
+		order they were added.
+		"""
+		bucket_key = (x // self.bucket_size, y // self.bucket_size)
+		claims = [claim for claim
+					in self._buckets.get(bucket_key, []) + self._large_claims
+					if claim['x'] <= x < claim['x'] + claim['w'] and
+						claim['y'] <= y < claim['y'] + claim['h']]
+		return sorted(claims,
+						key=lambda claim: self._claim_orders[claim['id']])
+
+	def get_claims_within(self, x, y, w, h):
+		"""
+		Returns the claims sharing at least one square inch with the
+		w x h rectangle whose top left square inch is at (x, y), ordered
+		by their ids.
+		"""
+		if not (w and h):
+			return []
+		claims = {}
+		bucket_claims = [self._buckets[bucket_key] for bucket_key
+							in self._get_occupied_bucket_keys(x, y, w, h)]
+		for bucket in bucket_claims + [self._large_claims]:
+			for claim in bucket:
+				if claim['x'] < x + w and x < claim['x'] + claim['w'] and \
+						claim['y'] < y + h and y < claim['y'] + claim['h']:
+					claims[claim['id']] = claim
+		return sorted(claims.values(), key=lambda claim: claim['id'])
+
+	def get_conflicting_claim_ids(self, claim):
+		"""
+		Returns the ids of the claims, other than claim itself, that
+		share at least one square inch with claim.
+		"""
+		return [other_claim['id'] for other_claim
+					in self.get_claims_within(claim['x'], claim['y'],
+												claim['w'], claim['h'])
+					if other_claim['id'] != claim['id']]
+
+	def get_overlapping_pairs(self):
+		"""
+		Returns the (id, other_id) pairs of all the claims that share at
+		least one square inch, found with get_overlapping_claim_pairs().
+		"""
+		return [(claim['id'], other_claim['id']) for claim, other_claim
+					in get_overlapping_claim_pairs(self.claims.values())]
+
+def _is_sparse(claims):
+	x_min, y_min, x_max, y_max = _get_fabric_bounds(claims)
+	return (x_max - x_min + 1) * (y_max - y_min + 1) > MAX_DENSE_CELLS
+
+def get_overlapping_area(claims, sparse=None):
+	"""
+	Returns the number of square inches covered by two or more claims.
+
+	Inputs -
+		claims - a list of dicts, each dict representing a claim. Same
+			dict as returned by _parse_claim().
+		sparse - bool, whether to sweep over the claims instead of
+			counting over a dense fabric. By default, the sweep is used
+			only when the fabric would have more than MAX_DENSE_CELLS
+			square inches.
+
+	Returns -
+		overlapping_area - int, number of square inches with overlaps.
+	"""
+	if sparse is None:
+		sparse = _is_sparse(claims)
+	if sparse:
+		return _get_overlapping_area_by_sweep(claims)
+	coverage_counts, _ = get_coverage_counts(claims)
+	return int((coverage_counts > 1).sum())
+
+def get_intact_claim_ids(claims, sparse=None):
+	"""
+	Returns the ids of the claims that don't overlap with any other
+	claim, in the order of the claims.
+
+	Inputs -
+		claims - a list of dicts, each dict representing a claim. Same
+			dict as returned by _parse_claim().
+		sparse - bool, same as in get_overlapping_area().
+
+	Returns -
+		intact_claim_ids - a list of claim ids.
+	"""
+	if sparse is None:
+		sparse = _is_sparse(claims)
+	if sparse:
+		return _get_intact_claim_ids_by_sweep(claims)
+	coverage_counts, origin = get_coverage_counts(claims)
+	return _get_intact_claim_ids(claims, coverage_counts, origin)
+
+def one(sparse=None):
 	claims = _get_input_list('day_three.txt')
-	fabric = _get_fabric_with_claims(claims)
-	return (fabric == -1).sum()
+	return get_overlapping_area(claims, sparse)
 
-def two():
+def two(sparse=None):
 	claims = _get_input_list('day_three.txt')
-	fabric = _get_fabric_with_claims(claims)
-	for claim in claims:
-		x, y, w, h = claim['x'], claim['y'], claim['w'], claim['h']
-		patch = fabric[x: x + w, y: y + h]
-		overlapping_square_inches = (patch == -1).sum()
-		if not overlapping_square_inches:
-			return claim['id']
+	intact_claim_ids = get_intact_claim_ids(claims, sparse)
+	if intact_claim_ids:
+		return intact_claim_ids[0]
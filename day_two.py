@@ -1,53 +1,131 @@
-import os
+import numpy as np
 
-from collections import Counter
+from loader import load_input
 
-from config import DATA_DIR
+CHECKSUM_BLOCK_ROWS = 2 ** 14
 
 
 def _get_input_list(input_file_name):
-	input_data_file = os.path.join(DATA_DIR, input_file_name)
-	with open(input_data_file, 'r') as fp:
-		input_data = [line.strip() for line in fp]
+	id_matrix = _get_id_matrix(input_file_name)
+	input_data = [box_id.tobytes().rstrip(b'\0').decode()
+				  for box_id in id_matrix]
 	return input_data
 
-def one():
-	box_ids = _get_input_list('day_two.txt')
-	box_ids_counters = [Counter(item) for item in box_ids]
-	doubles = [box_ids[ix] for ix, counter in enumerate(box_ids_counters)
-			   if 2 in counter.values()]
-	triples = [box_ids[ix] for ix, counter in enumerate(box_ids_counters)
-			   if 3 in counter.values()]
-	checksum = len(doubles) * len(triples)
+def get_id_matrix(input_data):
+	"""
+	Encodes newline separated box ids into a fixed width matrix, with
+	one row per box id. Shorter ids are padded with 0s, and whitespace
+	within the lines is treated as padding as well.
+
+	Inputs -
+		input_data - an np.uint8 array of the raw bytes of the box ids.
+
+	Returns -
+		id_matrix - an np.uint8 array of shape (number of ids, length
+			of the longest id).
+	"""
+	newline = ord('\n')
+	line_ends = np.flatnonzero(input_data == newline)
+	if input_data.size and input_data[-1] != newline:
+		line_ends = np.append(line_ends, input_data.size)
+	line_starts = np.concatenate(([0], line_ends[:-1] + 1))
+	lengths = line_ends - line_starts
+	width = lengths.max(initial=0)
+	id_matrix = np.zeros((len(lengths), width), dtype=np.uint8)
+	id_matrix[np.arange(width) < lengths[:, None]] = \
+		input_data[input_data != newline]
+	id_matrix[id_matrix <= ord(' ')] = 0
+	return id_matrix
+
+def _parse_input_file(input_data_file):
+	with open(input_data_file, 'rb') as fp:
+		input_data = np.frombuffer(fp.read(), dtype=np.uint8)
+	return get_id_matrix(input_data)
+
+def _get_id_matrix(input_file_name):
+	return load_input(input_file_name, _parse_input_file, 'id_matrix')
+
+def get_letter_histograms(id_matrix):
+	"""
+	Returns the number of times each letter occurs in each box id, with
+	a single bincount over the whole matrix. Each row's letters are
+	offset into a separate range of bins, and the padding is dropped.
+
+	Inputs -
+		id_matrix - same format as returned by get_id_matrix().
+
+	Returns -
+		histograms - an np.array of shape (number of ids, largest letter
+			value + 1), with the count of each letter value in a column.
+	"""
+	rows = id_matrix.shape[0]
+	bins = int(id_matrix.max(initial=0)) + 1
+	offsets = np.arange(rows)[:, None] * bins
+	histograms = np.bincount((offsets + id_matrix).ravel(),
+							 minlength=rows * bins).reshape(rows, bins)
+	histograms[:, 0] = 0
+	return histograms
+
+def get_checksum(id_matrix, rows_per_block=CHECKSUM_BLOCK_ROWS):
+	"""
+	Returns the number of box ids with any letter appearing exactly
+	twice multiplied by the number with any letter appearing exactly
+	thrice. The histograms are built rows_per_block box ids at a time,
+	and both counts are taken from the same histograms.
+	"""
+	doubles = 0
+	triples = 0
+	for row_start in range(0, id_matrix.shape[0], rows_per_block):
+		histograms = get_letter_histograms(
+			id_matrix[row_start: row_start + rows_per_block])
+		doubles += (histograms == 2).any(axis=1).sum()
+		triples += (histograms == 3).any(axis=1).sum()
+	checksum = int(doubles * triples)
 	return checksum
 
-def two():
-	def _get_similar_ids(box_ids):
+def one():
+	id_matrix = _get_id_matrix('day_two.txt')
+	return get_checksum(id_matrix)
+
+def get_similar_id_pairs(box_ids):
+	"""
+	Returns all the pairs of box ids which differ in exactly one
+	position. For each position, the box ids are hashed with that
+	position masked out, so that similar ids end up in the same bucket
+	instead of having to compare every pair of ids.
+
+	Inputs -
+		box_ids - a list of box id strings.
+
+	Returns -
+		similar_id_pairs - a sorted list of tuples, each tuple of the
+			format (ix, right_ix, faulty_position), with ix < right_ix
+			being indices into box_ids.
+	"""
+	similar_id_pairs = []
+	max_length = max((len(box_id) for box_id in box_ids), default=0)
+	for position in range(max_length):
+		buckets = {}
 		for ix, box_id in enumerate(box_ids):
-			for right_ix, right_box_id in enumerate(box_ids):
-				if ix == right_ix:
-					continue
-				else:
-					flag = False
-					faulty_position = 0
-					for char_ix in range(len(box_id)):
-						if box_id[char_ix] != right_box_id[char_ix]:
-							if not flag:
-								flag = True  # First different letter spotted
-								faulty_position = char_ix
-							else:
-								flag = False  # Second different letter spotted
-								break
-					if flag:
-						return ix, right_ix, faulty_position
+			if len(box_id) > position:
+				masked_id = box_id[:position] + box_id[position+1:]
+				buckets.setdefault(masked_id, []).append(ix)
+		for bucket in buckets.values():
+			for bucket_ix, ix in enumerate(bucket):
+				for right_ix in bucket[bucket_ix+1:]:
+					if box_ids[ix][position] != box_ids[right_ix][position]:
+						similar_id_pairs.append((ix, right_ix, position))
+	similar_id_pairs.sort()
+	return similar_id_pairs
 
+def two():
 	def _get_new_label(box_ids, idx, faulty_position):
 		new_label = box_ids[idx][:faulty_position] + \
 					box_ids[idx][faulty_position+1:]
 		return new_label
 
 	box_ids = _get_input_list('day_two.txt')
-	first_idx, second_idx, faulty_position = _get_similar_ids(box_ids)
+	first_idx, second_idx, faulty_position = get_similar_id_pairs(box_ids)[0]
 	new_first_idx = _get_new_label(box_ids, first_idx, faulty_position)
 	new_second_idx = _get_new_label(box_ids, second_idx, faulty_position)
 	assert new_first_idx == new_second_idx
@@ -0,0 +1,253 @@
+"""
+Seeded generators of synthetic puzzle inputs, in the same formats as
+the files in DATA_DIR, for testing how the solvers scale.
+
+Usage -
+    python generators.py day_six 100000 data/day_six_large.txt [--seed 1]
+
+Every generator yields its input as chunks of text, generating a
+bounded number of lines at a time, so that write_input() can write
+inputs far larger than the available memory.
+"""
+import argparse
+import string
+
+import numpy as np
+
+from datetime import date, timedelta
+
+CHUNK_LINES = 2 ** 16
+
+
+def _get_chunk_sizes(count, chunk_size=CHUNK_LINES):
+    for chunk_start in range(0, count, chunk_size):
+        yield min(chunk_size, count - chunk_start)
+
+def generate_frequency_changes(count, seed=0, max_change=20):
+    """
+    Generates count lines of signed frequency changes, like "+12" and
+    "-13", for day_one.
+    """
+    rng = np.random.default_rng(seed)
+    for chunk_size in _get_chunk_sizes(count):
+        changes = rng.integers(-max_change, max_change + 1, size=chunk_size)
+        yield ''.join('{:+d}\n'.format(change) for change in changes.tolist())
+
+def generate_box_ids(count, seed=0, length=26, one_off_pairs=1):
+    """
+    Generates count random box ids for day_two, among which there are
+    one_off_pairs pairs of ids which differ in exactly one position.
+    Apart from those, random ids of the default length are practically
+    certain to differ in several positions.
+    """
+    rng = np.random.default_rng(seed)
+    pair_positions = rng.choice(count, size=2 * one_off_pairs, replace=False)
+    pair_positions = pair_positions.reshape(-1, 2)
+    pair_positions.sort(axis=1)
+    twin_positions = dict(pair_positions.tolist())
+    pending_twins = {}
+    chunk_start = 0
+    for chunk_size in _get_chunk_sizes(count):
+        letters = rng.integers(ord('a'), ord('z') + 1,
+                               size=(chunk_size, length), dtype=np.uint8)
+        box_ids = [box_id.tobytes().decode() for box_id in letters]
+        for line_ix in range(chunk_start, chunk_start + chunk_size):
+            box_id = box_ids[line_ix - chunk_start]
+            if line_ix in pending_twins:
+                box_ids[line_ix - chunk_start] = pending_twins.pop(line_ix)
+            elif line_ix in twin_positions:
+                position = int(rng.integers(length))
+                letter = chr((ord(box_id[position]) - ord('a') +
+                              int(rng.integers(1, 26))) % 26 + ord('a'))
+                pending_twins[twin_positions[line_ix]] = \
+                    box_id[:position] + letter + box_id[position + 1:]
+        chunk_start += chunk_size
+        yield ''.join(box_id + '\n' for box_id in box_ids)
+
+def generate_claims(count, seed=0, fabric_size=1000, max_claim_size=30):
+    """
+    Generates count claims of the format "#id @ x,y: wxh" for
+    day_three, placed uniformly over a fabric_size x fabric_size
+    fabric.
+    """
+    rng = np.random.default_rng(seed)
+    claim_id = 1
+    for chunk_size in _get_chunk_sizes(count):
+        sizes = rng.integers(1, max_claim_size + 1, size=(chunk_size, 2))
+        corners = rng.integers(0, fabric_size - sizes + 1)
+        lines = []
+        for (x, y), (w, h) in zip(corners.tolist(), sizes.tolist()):
+            lines.append('#{} @ {},{}: {}x{}\n'.format(claim_id, x, y, w, h))
+            claim_id += 1
+        yield ''.join(lines)
+
+def generate_guard_log(days, seed=0, guards=20, max_naps=3,
+                       shuffle_days=100):
+    """
+    Generates the guard log of the given number of days for day_four.
+    Each day a random guard begins a shift shortly before or after
+    midnight, and takes up to max_naps naps in the midnight hour. The
+    lines are shuffled within blocks of shuffle_days days; pass at least
+    the number of days to shuffle the whole log, at the cost of holding
+    it in memory.
+    """
+    rng = np.random.default_rng(seed)
+    guard_ids = rng.choice(np.arange(10, 4000), size=guards, replace=False)
+    first_day = date(1518, 1, 1)
+    if days > (date.max - first_day).days:
+        raise ValueError('Too many days for a log starting in 1518: '
+                         '{}'.format(days))
+    for block_start in range(0, days, shuffle_days):
+        lines = []
+        for day_ix in range(block_start, min(block_start + shuffle_days,
+                                             days)):
+            day = first_day + timedelta(days=day_ix)
+            shift_minute = int(rng.integers(-10, 5))
+            shift_day = day - timedelta(days=1) if shift_minute < 0 else day
+            lines.append('[{} {:02d}:{:02d}] Guard #{} begins shift\n'.format(
+                shift_day.isoformat(), 23 if shift_minute < 0 else 0,
+                shift_minute % 60, rng.choice(guard_ids)))
+            nap_count = int(rng.integers(0, max_naps + 1))
+            nap_minutes = np.sort(rng.choice(np.arange(max(shift_minute, 0)
+                                                       + 1, 60),
+                                             size=2 * nap_count,
+                                             replace=False))
+            for sleeping_minute, waking_up_minute in \
+                    nap_minutes.reshape(-1, 2).tolist():
+                lines.append('[{} 00:{:02d}] falls asleep\n'.format(
+                    day.isoformat(), sleeping_minute))
+                lines.append('[{} 00:{:02d}] wakes up\n'.format(
+                    day.isoformat(), waking_up_minute))
+        rng.shuffle(lines)
+        yield ''.join(lines)
+
+def generate_polymer(length, seed=0, depth=4, reacting_fraction=0.5):
+    """
+    Generates a polymer of about length units for day_five, as a series
+    of lowercase units that survive, each followed, with the probability
+    reacting_fraction, by a block of 2 * depth units that reacts away
+    completely: depth random lowercase units followed by their
+    uppercase counterparts in reverse. Lowercase units never react with
+    each other, so the reduced polymer is exactly the surviving units,
+    and depth controls how deeply the reactions nest.
+    """
+    rng = np.random.default_rng(seed)
+    group_length = 1 + 2 * depth * reacting_fraction
+    generated_length = 0
+    while generated_length < length:
+        groups = max(1, min(CHUNK_LINES * 16,
+                            int((length - generated_length) / group_length)))
+        has_block = rng.random(groups) < reacting_fraction
+        group_lengths = 1 + 2 * depth * has_block
+        group_starts = np.concatenate(([0], np.cumsum(group_lengths)[:-1]))
+        units = np.empty(group_lengths.sum(), dtype=np.uint8)
+        units[group_starts] = rng.integers(ord('a'), ord('z') + 1,
+                                           size=groups)
+        block_starts = group_starts[has_block] + 1
+        lowercase_units = rng.integers(ord('a'), ord('z') + 1,
+                                       size=(len(block_starts), depth))
+        blocks = np.hstack((lowercase_units, lowercase_units[:, ::-1] - 32))
+        units[block_starts[:, None] + np.arange(2 * depth)] = blocks
+        generated_length += len(units)
+        yield units.tobytes().decode()
+    yield '\n'
+
+def generate_coordinates(count, seed=0, width=400, height=400):
+    """
+    Generates count coordinates of the format "x, y" for day_six,
+    spread uniformly over a width x height area.
+    """
+    rng = np.random.default_rng(seed)
+    for chunk_size in _get_chunk_sizes(count):
+        xs = rng.integers(0, width, size=chunk_size)
+        ys = rng.integers(0, height, size=chunk_size)
+        yield ''.join('{}, {}\n'.format(x, y)
+                      for x, y in zip(xs.tolist(), ys.tolist()))
+
+def _get_task_name(task_ix, tasks):
+    if tasks <= len(string.ascii_uppercase):
+        return string.ascii_uppercase[task_ix]
+    return '{}{}'.format(string.ascii_uppercase[task_ix % 26], task_ix // 26)
+
+def generate_instructions(tasks, seed=0, max_prerequisites=3, window=100):
+    """
+    Generates the instructions of a random DAG of the given number of
+    tasks for day_seven, as lines of the format "Step X must be finished
+    before step Y can begin.". The tasks are shuffled into a random
+    order, and each task after the first gets between 1 and
+    max_prerequisites prerequisites among the window tasks before it in
+    that order, so that the graph is acyclic and every task appears in
+    some line. The order is shuffled within blocks of at least
+    CHUNK_LINES tasks, only two of which are held at a time. With more
+    than 26 tasks, the tasks are named like "A0", "B0", ..., "Z0", "A1",
+    which day_seven times by their first letter, so "A0" takes as long
+    as "A".
+    """
+    rng = np.random.default_rng(seed)
+    block_size = max(CHUNK_LINES, window)
+    block_orders = {}
+
+    def _get_task(order_ix):
+        block = order_ix // block_size
+        task_ix = block * block_size + \
+            int(block_orders[block][order_ix % block_size])
+        return _get_task_name(task_ix, tasks)
+
+    lines = []
+    for order_ix in range(tasks):
+        block = order_ix // block_size
+        if not order_ix % block_size:
+            block_orders[block] = rng.permutation(
+                min(block_size, tasks - order_ix))
+            block_orders.pop(block - 2, None)
+        if not order_ix:
+            continue
+        window_start = max(0, order_ix - window)
+        prerequisite_count = min(
+            int(rng.integers(1, max(max_prerequisites, 1) + 1)),
+            order_ix - window_start)
+        prerequisites = rng.choice(np.arange(window_start, order_ix),
+                                   size=prerequisite_count, replace=False)
+        task = _get_task(order_ix)
+        for prerequisite_ix in prerequisites.tolist():
+            lines.append(
+                'Step {} must be finished before step {} can begin.\n'.format(
+                    _get_task(prerequisite_ix), task))
+        if len(lines) >= CHUNK_LINES:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+GENERATORS = {
+    'day_one': generate_frequency_changes,
+    'day_two': generate_box_ids,
+    'day_three': generate_claims,
+    'day_four': generate_guard_log,
+    'day_five': generate_polymer,
+    'day_six': generate_coordinates,
+    'day_seven': generate_instructions,
+}
+
+def write_input(chunks, output_file):
+    """
+    Writes the chunks of text yielded by a generator to output_file,
+    one chunk at a time.
+    """
+    with open(output_file, 'w') as fp:
+        for chunk in chunks:
+            fp.write(chunk)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('day', choices=sorted(GENERATORS))
+    parser.add_argument('size', type=int,
+                        help='lines, days (day_four), units (day_five) or '
+                             'tasks (day_seven) to generate')
+    parser.add_argument('output_file')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    write_input(GENERATORS[args.day](args.size, seed=args.seed),
+                args.output_file)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import marshal
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from functools import partial
+
+from config import DATA_DIR
+
+CACHE_DIR_NAME = '.cache'
+CACHE_VERSION = 2
+
+_loaded_inputs = {}
+_parser_hashes = {}
+
+
+def _get_file_hash(input_data_file):
+    file_hash = hashlib.sha1()
+    with open(input_data_file, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(2 ** 20), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+def _get_parser_key(parser):
+    """
+    Returns the qualified name of the parser along with a hash of the
+    code of the module it is defined in, so that a change to the parser,
+    or to any of the helpers beside it, invalidates the inputs it
+    cached. Parsers without a module file are hashed by their own code.
+    """
+    parser_name = '{}.{}'.format(parser.__module__, parser.__qualname__)
+    if parser_name not in _parser_hashes:
+        module_file = getattr(sys.modules.get(parser.__module__), '__file__',
+                              None)
+        try:
+            with open(module_file, 'rb') as fp:
+                code = fp.read()
+        except (OSError, TypeError):
+            code = marshal.dumps(parser.__code__)
+        _parser_hashes[parser_name] = hashlib.sha1(code).hexdigest()
+    return parser_name, _parser_hashes[parser_name]
+
+def _get_cache_files(input_data_file, cache_name):
+    """
+    Returns the paths of the cached array and of its metadata, which are
+    kept in a cache directory beside the input file.
+    """
+    input_dir, input_file_name = os.path.split(input_data_file)
+    cache_file = os.path.join(input_dir, CACHE_DIR_NAME,
+                              '{}.{}'.format(input_file_name, cache_name))
+    return cache_file + '.npy', cache_file + '.json'
+
+def _load_cached_input(input_data_file, cache_name, stat, parser_key):
+    """
+    Returns the cached array for the input file, or None if there is
+    no cache or it is out of date. The cache is taken to be up to date
+    if it was saved by the same parser, and the file's mtime and size
+    are unchanged, or failing that, if its hash is unchanged.
+    """
+    array_file, metadata_file = _get_cache_files(input_data_file, cache_name)
+    try:
+        with open(metadata_file, 'r') as fp:
+            metadata = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    if metadata.get('version') != CACHE_VERSION or \
+            metadata.get('parser') != list(parser_key) or \
+            metadata.get('size') != stat.st_size:
+        return None
+    if metadata.get('mtime_ns') != stat.st_mtime_ns:
+        if metadata.get('sha1') != _get_file_hash(input_data_file):
+            return None
+        metadata['mtime_ns'] = stat.st_mtime_ns
+        _write_metadata(metadata_file, metadata)
+    try:
+        return np.load(array_file, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+def _replace_file(output_file, write, mode):
+    """
+    Writes a file through a uniquely named temporary file beside it,
+    which then replaces it, so that readers never see a partly written
+    file and concurrent writers don't clobber each other's temporary
+    files. Returns whether the file was written.
+    """
+    output_dir, output_file_name = os.path.split(output_file)
+    try:
+        temp_fd, temp_file = tempfile.mkstemp(dir=output_dir,
+                                              prefix=output_file_name + '.',
+                                              suffix='.tmp')
+    except OSError:
+        return False
+    try:
+        with os.fdopen(temp_fd, mode) as fp:
+            write(fp)
+        os.replace(temp_file, output_file)
+    except OSError:
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+        return False
+    return True
+
+def _write_metadata(metadata_file, metadata):
+    _replace_file(metadata_file, partial(json.dump, metadata), 'w')
+
+def _save_cached_input(input_data_file, cache_name, stat, parser_key,
+                       parsed_input):
+    """
+    Saves the parsed input beside the input file, along with the parser
+    and the file's mtime, size and hash. Nothing is saved if the cache
+    directory can't be written to.
+    """
+    array_file, metadata_file = _get_cache_files(input_data_file, cache_name)
+    try:
+        os.makedirs(os.path.dirname(array_file), exist_ok=True)
+    except OSError:
+        return
+    if not _replace_file(array_file,
+                         lambda fp: np.save(fp, parsed_input,
+                                            allow_pickle=False),
+                         'wb'):
+        return
+    metadata = {
+        'version': CACHE_VERSION,
+        'parser': list(parser_key),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha1': _get_file_hash(input_data_file),
+    }
+    _write_metadata(metadata_file, metadata)
+
+def load_input(input_file_name, parser, cache_name):
+    """
+    Returns the parsed form of an input file in DATA_DIR, parsing the
+    text only when needed. Parsed inputs are memoized within the process,
+    and persisted as a .npy file in a cache directory beside the input
+    file, so that later runs can skip the parsing as well.
+
+    Inputs -
+        input_file_name - the name of the input file.
+        parser - a function which takes the path of the input file and
+            returns its parsed form as a numpy array. Structured arrays
+            can be used for inputs with several columns; object arrays
+            can't be cached.
+        cache_name - a name for the parsed form, unique per parser of
+            the same input file. The cache is also keyed by the
+            parser's qualified name and the hash of its module's code,
+            so editing the parser invalidates what it cached.
+
+    Returns -
+        parsed_input - the read-only numpy array returned by the parser.
+    """
+    input_data_file = os.path.join(DATA_DIR, input_file_name)
+    stat = os.stat(input_data_file)
+    source_key = (stat.st_mtime_ns, stat.st_size)
+    parser_key = _get_parser_key(parser)
+    memo_key = (os.path.abspath(input_data_file), cache_name, parser_key)
+    memoized_input = _loaded_inputs.get(memo_key)
+    if memoized_input is not None and memoized_input[0] == source_key:
+        return memoized_input[1]
+    parsed_input = _load_cached_input(input_data_file, cache_name, stat,
+                                      parser_key)
+    if parsed_input is None:
+        parsed_input = np.asarray(parser(input_data_file))
+        _save_cached_input(input_data_file, cache_name, stat, parser_key,
+                           parsed_input)
+    parsed_input.flags.writeable = False
+    _loaded_inputs[memo_key] = (source_key, parsed_input)
+    return parsed_input
+
+def clear_memoized_inputs():
+    _loaded_inputs.clear()
@@ -0,0 +1,62 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+
+def map_with_fallback(function, *iterables, processes=None,
+                      initializer=None, initargs=(), ordered=True):
+    """
+    Yields function(*args) for the arguments taken from the iterables in
+    turn, like map(), running the calls across a process pool. The calls
+    are run serially in this process instead if processes is 1, if there
+    is only one call, or if a process pool can't be started; and if the
+    pool breaks part way, the calls whose results haven't been yielded
+    yet are run serially. Exceptions raised by function itself are
+    raised as they are, never retried. Once the caller stops iterating
+    or a call fails, the calls which haven't started yet are cancelled,
+    after the ones that are running have finished.
+
+    Inputs -
+        function - a picklable function, called with one argument from
+            each of the iterables.
+        iterables - the iterables of the arguments.
+        processes - int, the number of worker processes, the number of
+            CPUs if None.
+        initializer - a function called with initargs in every worker
+            process when it starts, or in this process before the calls
+            are run serially.
+        ordered - bool, whether to yield the results in the order of
+            the arguments, rather than as the calls finish.
+
+    Returns -
+        results - an iterator of the results of the calls.
+    """
+    arguments = list(zip(*iterables))
+    finished_calls = set()
+    if processes != 1 and len(arguments) > 1:
+        executor = None
+        futures = {}
+        try:
+            executor = ProcessPoolExecutor(processes, initializer=initializer,
+                                           initargs=initargs)
+            for call_ix, call_arguments in enumerate(arguments):
+                futures[executor.submit(function, *call_arguments)] = call_ix
+        except (OSError, NotImplementedError, BrokenProcessPool):
+            futures = {}
+        try:
+            for future in futures if ordered else as_completed(futures):
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    break
+                finished_calls.add(futures[future])
+                yield result
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+    pending_arguments = [call_arguments
+                         for call_ix, call_arguments in enumerate(arguments)
+                         if call_ix not in finished_calls]
+    if pending_arguments and initializer is not None:
+        initializer(*initargs)
+    for call_arguments in pending_arguments:
+        yield function(*call_arguments)
@@ -0,0 +1,136 @@
+"""
+Runs the parts of several days' puzzles in one go, and reports each
+answer along with the time it took.
+
+Usage -
+    python run.py [one day_three ...] [--parts one two] [--processes 4]
+
+The day modules are found by their file names, and are only imported by
+the processes that run them, so that a run of a few days doesn't pay for
+importing the dependencies of the rest. The parts are run concurrently
+across a process pool, whose worker processes share the imported modules
+between the parts they run. The run stops at the first part that fails.
+"""
+import argparse
+import glob
+import importlib
+import os
+import sys
+import time
+import traceback
+
+from parallel import map_with_fallback
+
+PARTS = ('one', 'two')
+NUMBER_WORDS = ('one', 'two', 'three', 'four', 'five', 'six', 'seven',
+                'eight', 'nine', 'ten', 'eleven', 'twelve', 'thirteen',
+                'fourteen', 'fifteen', 'sixteen', 'seventeen', 'eighteen',
+                'nineteen', 'twenty')
+
+
+class PartFailedError(Exception):
+    pass
+
+
+def _get_day_number(day_module_name):
+    words = day_module_name[len('day_'):].split('_')
+    if not all(word in NUMBER_WORDS for word in words):
+        return len(NUMBER_WORDS) ** 2
+    return sum(NUMBER_WORDS.index(word) + 1 for word in words)
+
+def get_day_module_names(module_dir=None):
+    """
+    Returns the names of the day modules in module_dir, which defaults to
+    the directory of this file, ordered by day.
+    """
+    if module_dir is None:
+        module_dir = os.path.dirname(os.path.abspath(__file__))
+    module_names = [os.path.splitext(os.path.basename(module_file))[0]
+                    for module_file
+                    in glob.glob(os.path.join(module_dir, 'day_*.py'))]
+    return sorted(module_names,
+                  key=lambda name: (_get_day_number(name), name))
+
+def run_part(day_module_name, part):
+    """
+    Imports the day module, if it hasn't been imported by this process
+    yet, and runs one of its parts.
+
+    Returns -
+        answer - the part's answer.
+        run_time - the time it took to run the part in seconds, not
+            counting the import.
+    """
+    day_module = importlib.import_module(day_module_name)
+    start_time = time.perf_counter()
+    answer = getattr(day_module, part)()
+    return answer, time.perf_counter() - start_time
+
+def _run_day_part(day_module_name, part):
+    """
+    Runs a part with run_part(), raising any failure as a
+    PartFailedError naming the part.
+    """
+    try:
+        result = run_part(day_module_name, part)
+    except Exception as error:
+        raise PartFailedError('{}.{} failed'.format(
+            day_module_name, part)) from error
+    return day_module_name, part, result
+
+def run_days(day_module_names, parts=PARTS, processes=None):
+    """
+    Runs the given parts of the given days, yielding them as they
+    finish. The first part to fail stops the run, and is raised as a
+    PartFailedError once the parts that are already running have
+    finished.
+
+    Inputs -
+        day_module_names - the names of the day modules to run.
+        parts - the names of the parts to run of each day.
+        processes - the number of worker processes, as in
+            map_with_fallback().
+
+    Returns -
+        results - an iterator of (day_module_name, part, (answer,
+            run_time)) tuples.
+    """
+    day_parts = [(day_module_name, part)
+                 for day_module_name in day_module_names for part in parts]
+    yield from map_with_fallback(_run_day_part, *zip(*day_parts),
+                                 processes=processes, ordered=False)
+
+def _get_day_module_name(day):
+    return day if day.startswith('day_') else 'day_' + day
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('days', nargs='*',
+                        help='days to run, like "one" or "day_one"; all '
+                             'days by default')
+    parser.add_argument('--parts', nargs='+', choices=PARTS, default=PARTS)
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args(argv)
+    day_module_names = get_day_module_names()
+    if args.days:
+        selected_names = [_get_day_module_name(day) for day in args.days]
+        unknown_names = set(selected_names) - set(day_module_names)
+        if unknown_names:
+            parser.error('unknown days: {}'.format(
+                ', '.join(sorted(unknown_names))))
+        day_module_names = [name for name in day_module_names
+                            if name in selected_names]
+    start_time = time.perf_counter()
+    try:
+        for day_module_name, part, (answer, run_time) in \
+                run_days(day_module_names, args.parts, args.processes):
+            print('{}.{}: {} ({:.3f}s)'.format(day_module_name, part, answer,
+                                               run_time), flush=True)
+    except PartFailedError:
+        traceback.print_exc()
+        return 1
+    print('Total: {:.3f}s'.format(time.perf_counter() - start_time))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())